@@ -1,10 +1,69 @@
-from redis.asyncio import Redis
+import logging
+
+from redis.asyncio import BlockingConnectionPool, Redis
 
 from src.env import settings
+from src.metrics import TimedRedis
+
+logger = logging.getLogger(__name__)
+
+_redis_db_main: Redis | None = None
+
+
+def _redis_address() -> tuple[str, int]:
+    """Fails at startup with the offending setting, not a bare `int('')`."""
+    host = settings.REDIS_HOST.get_secret_value()
+    port = settings.REDIS_PORT.get_secret_value()
+    invalid = [
+        name
+        for name, ok in (("REDIS_HOST", host), ("REDIS_PORT", port.isdigit()))
+        if not ok
+    ]
+    if invalid:
+        raise RuntimeError(
+            f"{' and '.join(invalid)} must be set to connect to redis,"
+            " the port as a number"
+        )
+    return host, int(port)
+
+
+def init_redis_db_main() -> Redis:
+    """One pooled client per worker process, shared by every request."""
+    global _redis_db_main  # noqa: PLW0603
+    if _redis_db_main is None:
+        host, port = _redis_address()
+        pool = BlockingConnectionPool(
+            host=host,
+            port=port,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        _redis_db_main = TimedRedis(connection_pool=pool)
+    return _redis_db_main
+
+
+async def close_redis_db_main() -> None:
+    global _redis_db_main  # noqa: PLW0603
+    if _redis_db_main is None:
+        return
+    rds, _redis_db_main = _redis_db_main, None
+    await rds.aclose()
+    await rds.connection_pool.disconnect()
+
+
+def redis_pool_stats() -> dict[str, int]:
+    if _redis_db_main is None:
+        return {"max": settings.REDIS_MAX_CONNECTIONS, "in_use": 0, "idle": 0}
+    pool = _redis_db_main.connection_pool
+    return {
+        "max": pool.max_connections,
+        "in_use": len(pool._in_use_connections),  # noqa: SLF001
+        "idle": len(pool._available_connections),  # noqa: SLF001
+    }
 
 
 async def get_redis_db_main() -> Redis:
-    return Redis(
-        host=settings.REDIS_HOST.get_secret_value(),
-        port=int(settings.REDIS_PORT.get_secret_value()),
-    )
+    return init_redis_db_main()
@@ -0,0 +1,35 @@
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from src.app_api.dependencies import (
+    close_redis_db_main,
+    init_redis_db_main,
+    redis_pool_stats,
+)
+from src.common.async_utils import spawn
+from src.env import settings
+from src.metrics import mark_process_dead
+from src.service_llm.llm_clients import registry
+from src.service_llm.prompt_cache import listen_invalidations
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    rds = init_redis_db_main()
+    logger.info("startup :: redis pool ready %s", redis_pool_stats())
+    invalidations = spawn(listen_invalidations(rds))
+    if settings.LLM_WARMUP and not settings.is_testing:
+        await registry.warmup()
+    try:
+        yield
+    finally:
+        invalidations.cancel()
+        logger.info("shutdown :: closing redis pool %s", redis_pool_stats())
+        await close_redis_db_main()
+        await registry.aclose()
+        mark_process_dead()
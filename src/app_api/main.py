@@ -2,23 +2,28 @@ import logging
 
 from fastapi import FastAPI
 
+from src.app_api.lifecycle_events import lifespan
+from src.app_api.routes.health_router import health_router
 from src.app_api.routes.llm_router import llm_router
 from src.app_api.routes.prompt_router import prompt_router
-from src.app_api.middlewares import log_extra_middleware
+from src.app_api.middlewares import LogExtraMiddleware
+from src.metrics import MetricsMiddleware
 
 logger = logging.getLogger(__name__)
 
 
 def get_app() -> FastAPI:
     # init
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # routes
     app.include_router(llm_router)
     app.include_router(prompt_router)
+    app.include_router(health_router)
 
     # middlewares
-    app.middleware("http")(log_extra_middleware)
+    app.add_middleware(LogExtraMiddleware)
+    app.add_middleware(MetricsMiddleware)
 
     # exception handlers
     """app.add_exception_handler(
@@ -1,52 +1,106 @@
-import asyncio
+import contextlib
 import logging
-from collections.abc import Awaitable, Callable
+import time
+from contextvars import ContextVar
+from typing import Final
 
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src import log
+from src.common.timing import server_timing_header, timing_log_fields, timing_scope
 from src.env import settings
 
-lock = asyncio.Lock()
 logger = logging.getLogger(__name__)
 
+_NO_LOG_EXTRA: Final[dict[str, str]] = {}
+_QUIET_PATHS: Final = frozenset({"/health", "/metrics"})
+
+# log context of the request being served, for code that has no `Request`
+log_extra_var: ContextVar[dict[str, str]] = ContextVar(
+    "log_extra", default=_NO_LOG_EXTRA
+)
+
 
 async def get_log_extra(request: Request) -> dict[str, str]:
-    return getattr(request.state, "log_extra", {})
-
-
-async def log_extra_middleware(
-    request: Request, call_next: Callable[[Request], Awaitable[Response]]
-) -> Response:
-    if settings.is_local:
-        await lock.acquire()
-    host: str = request.headers.get(
-        "x-forwarded-for",
-        f"~{getattr(request.client, 'host', 'unknown')}:{getattr(request.client, 'port', 'unknown')}",
-    )
-    req_id = (
-        request.headers.get("x-correlation-id")
-        or request.headers.get("x-operation-id")
-        or request.headers.get("x-request-id")
-    )
-    with log.scope(
-        logger,
-        f"{request.method} {request.url.path} {request.url.query} from {host}",
-        req_id=req_id,
-        enable_endings=request.url.path != "/health",
-    ) as log_extra:
-        request.state.req_id = log_extra["req_id"]
-        request.state.log_extra = log_extra
-        response = await call_next(request)
-        log_extra["req_status"] = str(response.status_code)
-        # if CONTAINER_STAMP:
-        #    response.headers["X-Stoic-Backend-Version"] = CONTAINER_STAMP
-        response.headers["X-Request-ID"] = request.headers.get(
-            "x-request-id", log_extra["req_id"]
-        )
-        response.headers["X-Operation-ID"] = log_extra["req_id"]
-        response.headers["X-Correlation-ID"] = log_extra["req_id"]
-    if settings.is_local:
-        lock.release()
-    return response
+    return getattr(request.state, "log_extra", None) or log_extra_var.get()
+
+
+class LogExtraMiddleware:
+    """Pure ASGI middleware opening a `log.scope` per HTTP request.
+
+    The request id comes from the correlation headers (or is generated by
+    `log.scope`), is exposed through `request.state` and `log_extra_var` and
+    echoed in the response headers. Messages are forwarded as they come, so
+    streaming responses are never buffered."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forwarded_for = correlation_id = operation_id = request_id = None
+        for name, value in scope["headers"]:
+            match name:
+                case b"x-forwarded-for":
+                    forwarded_for = value.decode("latin-1")
+                case b"x-correlation-id":
+                    correlation_id = value.decode("latin-1")
+                case b"x-operation-id":
+                    operation_id = value.decode("latin-1")
+                case b"x-request-id":
+                    request_id = value.decode("latin-1")
+        client = scope.get("client") or ("unknown", "unknown")
+        host = forwarded_for or f"~{client[0]}:{client[1]}"
+        query = scope.get("query_string", b"").decode("latin-1")
+        path = scope["path"]
+
+        with (
+            log.scope(
+                logger,
+                f"{scope['method']} {path} {query} from {host}",
+                req_id=correlation_id or operation_id or request_id,
+                enable_endings=path not in _QUIET_PATHS,
+            ) as log_extra,
+            timing_scope()
+            if settings.SERVER_TIMING
+            else contextlib.nullcontext() as spans,
+        ):
+            started_at = time.perf_counter()
+            req_id = log_extra["req_id"].encode("latin-1")
+            state = scope.setdefault("state", {})
+            state["req_id"] = log_extra["req_id"]
+            state["log_extra"] = log_extra
+            token = log_extra_var.set(log_extra)
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    log_extra["req_status"] = str(message["status"])
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (
+                            b"x-request-id",
+                            request_id.encode("latin-1") if request_id else req_id,
+                        ),
+                        (b"x-operation-id", req_id),
+                        (b"x-correlation-id", req_id),
+                    ]
+                    if spans is not None:
+                        total_ms = (time.perf_counter() - started_at) * 1000
+                        message["headers"].append(
+                            (
+                                b"server-timing",
+                                server_timing_header(spans, total_ms).encode("latin-1"),
+                            )
+                        )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                log_extra_var.reset(token)
+                if spans:
+                    log_extra.update(timing_log_fields(spans))
@@ -1,10 +1,10 @@
 from pydantic import BaseModel
 
-from src.dto.llm_info import Exclude
+from src.dto.llm_info import Exclude, Provider
 
 
 class LLMRequestParametersApiMdl(BaseModel):
-    prompt_version_id: int = 0
+    prompt_version_id: int | None = 0  # null resolves to the latest version
     text: str
     context: str
     exclude: Exclude
@@ -12,6 +12,25 @@ class LLMRequestParametersApiMdl(BaseModel):
     temperature: int
 
 
+class LLMBatchItemApiMdl(LLMRequestParametersApiMdl):
+    cache_key: str = ""
+
+
+class LLMJobRequestMdl(BaseModel):
+    """Everything a worker needs to replay a `create_query` call."""
+
+    prompt_id: int
+    lang_abbr: str
+    params: LLMRequestParametersApiMdl
+    provider: Provider = Provider.openai
+    cache_key: str = ""
+    auto_cache: bool = False
+    fallback_providers: list[Provider] = []
+    hedge: bool = False
+    chunked: bool = False
+    translation_memory: bool = False
+
+
 class PromptRequestApiMdl(BaseModel):
     prompt_id: int
     prompt_template: str
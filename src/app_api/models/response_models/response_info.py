@@ -1,16 +1,61 @@
-from datetime import datetime
+from datetime import date, datetime
+from enum import StrEnum
 
 from pydantic import BaseModel
 
 from src.dto.llm_info import Provider
 
 
+class UsageApiMdl(BaseModel):
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+
+
 class ResponseLLMApiMdl(BaseModel):
     prompt_id: int
     translations: list[str]
     error: str
     provider: Provider
     created_at: datetime
+    served_by: list[Provider] = []  # provider behind each translation
+    usage: list[UsageApiMdl] = []  # per translation, only with include_usage
+    memory_hit_ratio: float | None = None  # segments from the translation memory
+
+
+class StreamChunkApiMdl(BaseModel):
+    variant: int | None = None
+    delta: str = ""
+    done: bool = False
+    error: str = ""
+    result: ResponseLLMApiMdl | None = None
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobApiMdl(BaseModel):
+    job_id: str
+    status: JobStatus
+    attempts: int = 0
+    created_at: datetime
+    updated_at: datetime
+    error: str = ""
+    result: ResponseLLMApiMdl | None = None
+
+
+class UsageStatApiMdl(BaseModel):
+    day: date
+    prompt_version: str
+    provider: Provider
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
 
 
 class ResponsePromptApiMdl(BaseModel):
@@ -0,0 +1,37 @@
+import logging
+
+from typing import Any
+
+from fastapi import APIRouter, Response
+
+from src.app_api.dependencies import redis_pool_stats
+from src.metrics import render_metrics
+from src.service_llm.circuit_breaker import breakers_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+health_router = APIRouter(
+    tags=["health router"],
+)
+
+
+@health_router.get("/health")
+async def health() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@health_router.get("/health/redis_pool")
+async def get_redis_pool_stats() -> dict[str, int]:
+    return redis_pool_stats()
+
+
+@health_router.get("/health/circuit_breakers")
+async def get_circuit_breakers() -> dict[str, dict[str, Any]]:
+    return breakers_snapshot()
+
+
+@health_router.get("/metrics", include_in_schema=False)
+def get_metrics() -> Response:
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
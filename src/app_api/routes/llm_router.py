@@ -1,16 +1,29 @@
 import logging
+from datetime import date, datetime, timezone
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from redis.asyncio import Redis
 
 from src.app_api.dependencies import get_redis_db_main
 from src.app_api.middlewares import get_log_extra
 from src.app_api.models.request_models.request_info import (
+    LLMBatchItemApiMdl,
+    LLMJobRequestMdl,
     LLMRequestParametersApiMdl,
 )
-from src.app_api.models.response_models.response_info import ResponseLLMApiMdl
+from src.app_api.models.response_models.response_info import (
+    JobApiMdl,
+    ResponseLLMApiMdl,
+    StreamChunkApiMdl,
+    UsageStatApiMdl,
+)
 from src.dto.llm_info import Provider
-from src.service_llm import llm_manager
+from src.env import settings
+from src.app_celery.main import enqueue_llm_job
+from src.service_llm import llm_jobs, llm_manager
+from src.service_llm.provider_router import Routing
+from src.service_llm.usage import get_usage
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +33,18 @@ llm_router = APIRouter(
 )
 
 
+def _with_usage(response: ResponseLLMApiMdl, include_usage: bool) -> ResponseLLMApiMdl:
+    if include_usage or not response.usage:
+        return response
+    return response.model_copy(update={"usage": []})
+
+
+def _stream_line(chunk: StreamChunkApiMdl, include_usage: bool) -> str:
+    if chunk.result is not None:
+        chunk.result = _with_usage(chunk.result, include_usage)
+    return f"{chunk.model_dump_json(exclude_defaults=True)}\n"
+
+
 @llm_router.post("/create_query/{prompt_id}/{lang_abbr}")
 async def create_query(
     prompt_id: int,
@@ -27,10 +52,46 @@ async def create_query(
     llm_query_params: LLMRequestParametersApiMdl,
     provider: Provider = Provider.openai,
     cache_key: str = "",
+    auto_cache: bool = False,
+    fallback_providers: list[Provider] = Query(default=[]),
+    hedge: bool = False,
+    include_usage: bool = False,
+    normalized_cache: bool = False,
+    chunked: bool = False,
+    translation_memory: bool = False,
     redis: Redis = Depends(get_redis_db_main),
     log_extra: dict[str, str] = Depends(get_log_extra),
 ) -> ResponseLLMApiMdl:
-    return await llm_manager.create_query(
+    response = await llm_manager.create_query(
+        prompt_id,
+        llm_query_params,
+        provider,
+        cache_key,
+        lang_abbr,
+        redis,
+        log_extra=log_extra,
+        auto_cache=auto_cache,
+        routing=Routing(fallbacks=tuple(fallback_providers), hedge=hedge),
+        normalized=normalized_cache,
+        chunked=chunked,
+        translation_memory=translation_memory,
+    )
+    return _with_usage(response, include_usage)
+
+
+@llm_router.post("/create_query_stream/{prompt_id}/{lang_abbr}")
+async def create_query_stream(
+    prompt_id: int,
+    lang_abbr: str,
+    llm_query_params: LLMRequestParametersApiMdl,
+    provider: Provider = Provider.openai,
+    cache_key: str = "",
+    auto_cache: bool = False,
+    include_usage: bool = False,
+    redis: Redis = Depends(get_redis_db_main),
+    log_extra: dict[str, str] = Depends(get_log_extra),
+) -> StreamingResponse:
+    chunks = llm_manager.create_query_stream(
         prompt_id,
         llm_query_params,
         provider,
@@ -38,9 +99,98 @@ async def create_query(
         lang_abbr,
         redis,
         log_extra=log_extra,
+        auto_cache=auto_cache,
+    )
+    return StreamingResponse(
+        (_stream_line(chunk, include_usage) async for chunk in chunks),
+        media_type="application/x-ndjson",
     )
 
 
+@llm_router.post("/create_query_batch/{prompt_id}/{lang_abbr}")
+async def create_query_batch(
+    prompt_id: int,
+    lang_abbr: str,
+    items: list[LLMBatchItemApiMdl] = Body(max_length=settings.LLM_BATCH_MAX_ITEMS),
+    provider: Provider = Provider.openai,
+    auto_cache: bool = False,
+    fallback_providers: list[Provider] = Query(default=[]),
+    hedge: bool = False,
+    include_usage: bool = False,
+    redis: Redis = Depends(get_redis_db_main),
+    log_extra: dict[str, str] = Depends(get_log_extra),
+) -> list[ResponseLLMApiMdl]:
+    responses = await llm_manager.create_query_batch(
+        prompt_id,
+        items,
+        provider,
+        lang_abbr,
+        redis,
+        log_extra=log_extra,
+        auto_cache=auto_cache,
+        routing=Routing(fallbacks=tuple(fallback_providers), hedge=hedge),
+    )
+    return [_with_usage(response, include_usage) for response in responses]
+
+
+@llm_router.post("/create_query_job/{prompt_id}/{lang_abbr}")
+async def create_query_job(
+    prompt_id: int,
+    lang_abbr: str,
+    llm_query_params: LLMRequestParametersApiMdl,
+    provider: Provider = Provider.openai,
+    cache_key: str = "",
+    auto_cache: bool = False,
+    fallback_providers: list[Provider] = Query(default=[]),
+    hedge: bool = False,
+    chunked: bool = False,
+    translation_memory: bool = False,
+    redis: Redis = Depends(get_redis_db_main),
+) -> JobApiMdl:
+    """`create_query` run by the Celery workers; returns the job right away,
+    poll `/query_job/{job_id}` for the result."""
+    request = LLMJobRequestMdl(
+        prompt_id=prompt_id,
+        lang_abbr=lang_abbr,
+        params=llm_query_params,
+        provider=provider,
+        cache_key=cache_key,
+        auto_cache=auto_cache,
+        fallback_providers=fallback_providers,
+        hedge=hedge,
+        chunked=chunked,
+        translation_memory=translation_memory,
+    )
+    return await llm_jobs.submit_job(request, redis, enqueue_llm_job)
+
+
+@llm_router.get("/query_job/{job_id}")
+async def get_query_job(
+    job_id: str,
+    wait: float = 0.0,
+    redis: Redis = Depends(get_redis_db_main),
+) -> JobApiMdl:
+    """Job state; `wait` seconds (capped by `JOB_MAX_WAIT_S`) long-polls
+    until the job is done or failed."""
+    job = await llm_jobs.get_job(job_id, wait, redis)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job not found: {job_id}")
+    return job
+
+
+@llm_router.get("/usage")
+async def usage(
+    day_from: date | None = None,
+    day_to: date | None = None,
+    prompt_id: int | None = None,
+    redis: Redis = Depends(get_redis_db_main),
+) -> list[UsageStatApiMdl]:
+    """Daily token and cost totals per prompt version and provider (UTC days,
+    at most `LLM_USAGE_MAX_QUERY_DAYS` starting at `day_from`)."""
+    day_to = day_to or datetime.now(timezone.utc).date()
+    return await get_usage(day_from or day_to, day_to, prompt_id, redis)
+
+
 """@parser_router.get("/progress_parser")
 async def get_progress(info_parsing_parameters: LLMParametersApiMdl, log_extra: dict[str, str] = Depends(get_log_extra)) -> None:
     await scrapy_manager.get_progress_parsing(info_parsing_parameters, log_extra=log_extra)
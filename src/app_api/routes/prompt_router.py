@@ -1,6 +1,6 @@
 import logging
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from redis.asyncio import Redis
 
 from src.app_api.dependencies import get_redis_db_main
@@ -12,6 +12,7 @@ from src.app_api.models.request_models.request_info import (
 from src.app_api.models.response_models.response_info import (
     ResponsePromptApiMdl,
 )
+from src.errors import PromptTemplateError
 from src.service_llm import llm_manager
 
 logger = logging.getLogger(__name__)
@@ -28,7 +29,10 @@ async def create_prompt(
     redis: Redis = Depends(get_redis_db_main),
     log_extra: dict[str, str] = Depends(get_log_extra),
 ) -> None:
-    await llm_manager.create_prompt(prompt_parameters, redis, log_extra=log_extra)
+    try:
+        await llm_manager.create_prompt(prompt_parameters, redis, log_extra=log_extra)
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 @prompt_router.get("/get_prompt/{prompt_id}")
@@ -48,7 +52,10 @@ async def modify_prompt(
     redis: Redis = Depends(get_redis_db_main),
     log_extra: dict[str, str] = Depends(get_log_extra),
 ) -> None:
-    await llm_manager.modify_prompt(modify_parameters, redis, log_extra=log_extra)
+    try:
+        await llm_manager.modify_prompt(modify_parameters, redis, log_extra=log_extra)
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 """@parser_router.get("/progress_parser")
@@ -0,0 +1,94 @@
+import json
+from typing import Any
+
+from fakeredis.aioredis import FakeRedis
+from fastapi.testclient import TestClient
+
+from src.app_api.dependencies import get_redis_db_main
+from src.app_api.main import get_app
+from src.conftest import FakeLLM
+from src.env import settings
+
+
+def test_create_query_batch(rds: FakeRedis, fake_llm: FakeLLM, prompt: int) -> None:
+    fake_llm.reply = (
+        lambda text: RuntimeError("provider down") if text == "boom" else text.upper()
+    )
+    app = get_app()
+    app.dependency_overrides[get_redis_db_main] = lambda: rds
+    client = TestClient(app)
+
+    def item(text: str, cache_key: str = "") -> dict[str, Any]:
+        return {
+            "text": text,
+            "context": "",
+            "exclude": {"exception": "", "exceptions_list": []},
+            "variants": 1,
+            "temperature": 0,
+            "cache_key": cache_key,
+        }
+
+    url = f"/create_query_batch/{prompt}/de"
+    assert client.post(url, json=[item("hello", "batch-hello")]).status_code == 200
+
+    response = client.post(
+        url, json=[item("hello", "batch-hello"), item("bye"), item("boom")]
+    )
+    assert response.status_code == 200
+    hit, miss, failed = response.json()
+    assert hit["translations"] == ["HELLO"] and not hit["error"]
+    assert miss["translations"] == ["BYE"] and not miss["error"]
+    assert failed["translations"] == [] and "provider down" in failed["error"]
+    assert fake_llm.texts == ["hello", "bye", "boom"]
+
+    too_many = [item("hi")] * (settings.LLM_BATCH_MAX_ITEMS + 1)
+    assert client.post(url, json=too_many).status_code == 422
+
+
+def test_create_query_stream(rds: FakeRedis, fake_llm: FakeLLM, prompt: int) -> None:
+    outcomes: list[str | BaseException] = [
+        "hola <keep>Acme</keep>",
+        "hallo <keep>Acme</keep>",
+        RuntimeError("provider down"),
+    ]
+    fake_llm.reply = lambda text: outcomes.pop(0)
+    app = get_app()
+    app.dependency_overrides[get_redis_db_main] = lambda: rds
+    client = TestClient(app)
+
+    response = client.post(
+        f"/create_query_stream/{prompt}/es",
+        params={"cache_key": "stream-key"},
+        json={
+            "text": "hello Acme",
+            "context": "",
+            "exclude": {"exception": "", "exceptions_list": ["Acme"]},
+            "variants": 3,
+            "temperature": 0,
+        },
+    )
+    assert response.status_code == 200
+    chunks = [json.loads(line) for line in response.text.splitlines()]
+    deltas = [chunk for chunk in chunks if "delta" in chunk]
+    order = [chunk["variant"] for chunk in deltas]
+    assert order != sorted(order)  # variants are sent as they arrive
+
+    streamed = {i: "" for i in range(3)}
+    for chunk in deltas:
+        streamed[chunk["variant"]] += chunk["delta"]
+    # the `<keep>` tags straddle chunk boundaries and are still stripped
+    assert streamed[0] == "hola Acme" and streamed[1] == "hallo Acme"
+    failed = [chunk for chunk in chunks if chunk.get("error") and chunk.get("done")]
+    assert [chunk.get("variant", 0) for chunk in failed] == [2]
+
+    result = chunks[-1]["result"]
+    assert result["translations"] == ["hola Acme", "hallo Acme", ""]
+    assert "provider down" in result["error"]
+    # the partial result was not cached: asking again reaches the provider
+    outcomes.extend(["hola", "hallo", "hej"])
+    response = client.post(response.url, json=json.loads(response.request.content))
+    assert json.loads(response.text.splitlines()[-1])["result"]["translations"] == [
+        "hola",
+        "hallo",
+        "hej",
+    ]
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from pydantic import SecretStr
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from src.app_api import dependencies, lifecycle_events
+from src.app_api.dependencies import get_redis_db_main, init_redis_db_main
+from src.app_api.lifecycle_events import lifespan
+from src.env import settings
+
+
+def test_lifespan_shares_one_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "REDIS_HOST", SecretStr("localhost"))
+    monkeypatch.setattr(settings, "REDIS_PORT", SecretStr("6379"))
+    listened: list[Redis] = []
+    disconnected: list[BlockingConnectionPool] = []
+
+    async def listen(rds: Redis) -> None:
+        listened.append(rds)
+        await asyncio.Event().wait()
+
+    async def disconnect(pool: BlockingConnectionPool, **kwargs: object) -> None:
+        disconnected.append(pool)
+
+    monkeypatch.setattr(lifecycle_events, "listen_invalidations", listen)
+    monkeypatch.setattr(BlockingConnectionPool, "disconnect", disconnect)
+
+    async def _run() -> None:
+        async with lifespan(FastAPI()):
+            rds = await get_redis_db_main()
+            assert await get_redis_db_main() is rds
+            await asyncio.sleep(0)
+            assert listened == [rds]
+        assert disconnected == [rds.connection_pool]
+        assert dependencies._redis_db_main is None  # noqa: SLF001
+
+    asyncio.run(_run())
+
+
+@pytest.mark.parametrize(("host", "port"), [("localhost", ""), ("", "6379")])
+def test_missing_redis_settings(
+    monkeypatch: pytest.MonkeyPatch, host: str, port: str
+) -> None:
+    monkeypatch.setattr(settings, "REDIS_HOST", SecretStr(host))
+    monkeypatch.setattr(settings, "REDIS_PORT", SecretStr(port))
+    missing = "REDIS_PORT" if host else "REDIS_HOST"
+    with pytest.raises(RuntimeError, match=missing):
+        init_redis_db_main()
@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from src.app_api.middlewares import LogExtraMiddleware, get_log_extra, log_extra_var
+
+
+def test_log_extra_middleware() -> None:
+    app = FastAPI()
+    app.add_middleware(LogExtraMiddleware)
+    both_in = asyncio.Barrier(2)
+
+    @app.get("/echo")
+    async def echo(log_extra: dict[str, str] = Depends(get_log_extra)) -> bool:
+        await both_in.wait()  # deadlocks if requests are serialised
+        return log_extra is log_extra_var.get()
+
+    async def main() -> None:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            responses = await asyncio.wait_for(
+                asyncio.gather(
+                    client.get("/echo", headers={"x-request-id": "abc"}),
+                    client.get("/echo"),
+                ),
+                timeout=5,
+            )
+        assert [r.json() for r in responses] == [True, True]
+        assert responses[0].headers["x-request-id"] == "abc"
+        assert "x-correlation-id" in responses[1].headers  # empty under ENV=test
+
+    asyncio.run(main())
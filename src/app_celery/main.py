@@ -0,0 +1,51 @@
+import logging
+
+from celery import Celery
+
+from src.common.async_utils import sync_to_async
+from src.env import AppName, settings
+
+logger = logging.getLogger(__name__)
+
+RUN_LLM_JOB: str = "app_celery.run_llm_job"
+
+
+def broker_url() -> str:
+    broker = settings.CELERY_BROKER.get_secret_value()
+    if broker:
+        return broker
+    host = settings.REDIS_HOST.get_secret_value() or "localhost"
+    port = settings.REDIS_PORT.get_secret_value() or "6379"
+    return f"redis://{host}:{port}/0"
+
+
+def get_app() -> Celery:
+    app = Celery(
+        AppName.app_celery.value,
+        broker=broker_url(),
+        include=["src.app_celery.tasks"],
+    )
+    app.conf.update(
+        # at-least-once: ack after the task ran, redeliver if the worker dies
+        task_acks_late=True,
+        task_reject_on_worker_lost=True,
+        worker_prefetch_multiplier=1,
+        task_default_queue=settings.JOB_QUEUE,
+        # job results live in Redis under llm_job:{id}, not in a result backend
+        task_ignore_result=True,
+        broker_transport_options={
+            "visibility_timeout": settings.JOB_VISIBILITY_TIMEOUT_S
+        },
+        broker_connection_retry_on_startup=True,
+    )
+    return app
+
+
+celery_app = get_app()
+
+
+async def enqueue_llm_job(job_id: str) -> None:
+    # kombu publishes synchronously, keep it off the event loop
+    await sync_to_async(celery_app.send_task)(
+        RUN_LLM_JOB, args=[job_id], task_id=job_id
+    )
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+from celery import Task
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from src import log
+from src.app_api.dependencies import close_redis_db_main, init_redis_db_main
+from src.app_celery.main import RUN_LLM_JOB, celery_app
+from src.common.async_utils import spawn
+from src.env import AppName, settings
+from src.service_llm.llm_clients import registry
+from src.service_llm.llm_jobs import run_job
+from src.service_llm.prompt_cache import listen_invalidations
+
+logger = logging.getLogger(__name__)
+
+TR = TypeVar("TR")
+
+# one event loop per worker process, so Redis and provider connection pools
+# survive between tasks instead of being rebuilt by asyncio.run()
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def run_async(coro: Coroutine[Any, Any, TR]) -> TR:
+    global _loop  # noqa: PLW0603
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+        _loop.run_until_complete(_start_worker())
+    return _loop.run_until_complete(coro)
+
+
+async def _start_worker() -> None:
+    # templates changed by the API are dropped while tasks run the loop
+    spawn(listen_invalidations(init_redis_db_main()))
+
+
+async def _stop_worker() -> None:
+    await close_redis_db_main()
+    await registry.aclose()
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs: Any) -> None:
+    settings.app = AppName.app_celery
+    log.setup_logging()
+    log.setup_sentry()
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs: Any) -> None:
+    if _loop is not None and not _loop.is_closed():
+        _loop.run_until_complete(_stop_worker())
+        _loop.close()
+
+
+@celery_app.task(name=RUN_LLM_JOB, bind=True, max_retries=None)
+def run_llm_job(self: Task, job_id: str) -> None:
+    attempt = self.request.retries + 1
+    if run_async(run_job(job_id, attempt, init_redis_db_main())):
+        countdown = settings.JOB_RETRY_BACKOFF_S * 2 ** (attempt - 1)
+        logger.warning(
+            "run_llm_job :: %s attempt %s failed, retry in %0.1fs",
+            job_id,
+            attempt,
+            countdown,
+        )
+        raise self.retry(countdown=countdown)
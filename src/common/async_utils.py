@@ -2,7 +2,7 @@ import asyncio
 import logging
 from collections.abc import Callable, Coroutine
 from functools import partial, wraps
-from typing import Any, Final, TypeVar
+from typing import Any, Final, Generic, TypeVar
 
 from typing_extensions import ParamSpec
 
@@ -34,6 +34,71 @@ async def run_list(tasks: list[Coroutine[None, None, TR]], size: int) -> list[TR
     return results
 
 
+async def gather_limited(
+    coros: list[Coroutine[Any, Any, TR]], limit: int
+) -> list[TR | BaseException]:
+    """Runs coroutines concurrently, at most `limit` at a time.
+
+    Results keep the order of `coros`; exceptions are returned in place
+    of results instead of cancelling the siblings."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(coro: Coroutine[Any, Any, TR]) -> TR:
+        async with semaphore:
+            return await coro
+
+    return list(
+        await asyncio.gather(*(_run(coro) for coro in coros), return_exceptions=True)
+    )
+
+
+_background_tasks: set[asyncio.Task[Any]] = set()
+
+
+def spawn(coro: Coroutine[Any, Any, Any]) -> asyncio.Task[Any]:
+    """Fire-and-forget task that is kept alive until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_log_background_task)
+    return task
+
+
+def _log_background_task(task: asyncio.Task[Any]) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("background task failed: %r", task.exception())
+
+
+class SingleFlight(Generic[TR]):
+    """Coalesces concurrent calls sharing a key into one execution.
+
+    The first caller starts the work as a task; callers arriving while it
+    runs wait for the same result or exception, at most `timeout` seconds.
+    The task is shielded, so a cancelled caller does not abort it for the
+    others."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Task[TR]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Coroutine[Any, Any, TR]],
+        timeout: float | None = None,
+    ) -> TR:
+        task = self._calls.get(key)
+        if task is not None:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+        task = asyncio.create_task(func())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+
 def run_on_loop(some: Coroutine[Any, Any, _TR]) -> _TR:
     try:
         loop = asyncio.get_event_loop()
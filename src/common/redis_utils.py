@@ -0,0 +1,26 @@
+import hashlib
+from collections.abc import Sequence
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+
+
+class LuaScript:
+    """A Lua script hashed once at import and run by its SHA on any client.
+
+    Unlike `Redis.register_script` nothing is rebuilt per call; the source
+    is only sent when the server does not know the script yet."""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.sha = hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    async def __call__(
+        self, rds: Redis, keys: Sequence[str], args: Sequence[Any] = ()
+    ) -> Any:
+        try:
+            return await rds.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            await rds.script_load(self.source)
+            return await rds.evalsha(self.sha, len(keys), *keys, *args)
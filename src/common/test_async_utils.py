@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from src.common.async_utils import SingleFlight, gather_limited
+
+
+def test_gather_limited() -> None:
+    running = 0
+    max_running = 0
+
+    async def job(i: int) -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01 * (5 - i))
+        running -= 1
+        if i == 3:
+            raise ValueError(i)
+        return i
+
+    results = asyncio.run(gather_limited([job(i) for i in range(5)], 2))
+
+    assert max_running == 2
+    assert results[:3] == [0, 1, 2]
+    assert isinstance(results[3], ValueError)
+    assert results[4] == 4
+
+
+def test_single_flight() -> None:
+    calls = 0
+
+    async def work(fail: bool = False) -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        if fail:
+            raise ValueError("boom")
+        return calls
+
+    async def main() -> None:
+        flights: SingleFlight[int] = SingleFlight()
+        assert (
+            await asyncio.gather(*(flights.do("a", work) for _ in range(5))) == [1] * 5
+        )
+        assert len(flights) == 0
+
+        results = await asyncio.gather(
+            *(flights.do("b", lambda: work(fail=True)) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+        assert calls == 2
+
+        leader = asyncio.create_task(flights.do("c", work))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await flights.do("c", work, timeout=0.001)
+        assert await leader == 3
+
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+import asyncio
+
+from src.common.timing import (
+    server_timing_header,
+    span,
+    timing_log_fields,
+    timing_scope,
+)
+
+
+def test_timing() -> None:
+    with span("off"):
+        pass
+
+    async def variant(i: int) -> None:
+        with span("llm"):
+            await asyncio.sleep(0)
+
+    async def main() -> list[tuple[str, float]]:
+        with timing_scope() as spans:
+            with span("redis"):
+                pass
+            await asyncio.gather(*(variant(i) for i in range(2)))
+        with span("after"):
+            pass
+        return spans
+
+    spans = asyncio.run(main())
+    assert [name for name, _ in spans] == ["redis", "llm", "llm"]
+    assert server_timing_header(spans, 1.0).endswith("total;dur=1.00")
+    assert set(timing_log_fields(spans)) == {"timing_redis_ms", "timing_llm_ms"}
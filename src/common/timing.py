@@ -0,0 +1,83 @@
+import contextlib
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from types import TracebackType
+from typing import Final
+
+# (stage, milliseconds) of the current request; None while timing is off
+_spans: ContextVar[list[tuple[str, float]] | None] = ContextVar(
+    "timing_spans", default=None
+)
+
+
+class _Span:
+    __slots__ = ("_name", "_spans", "_started_at")
+
+    def __init__(self, name: str, spans: list[tuple[str, float]]) -> None:
+        self._name = name
+        self._spans = spans
+        self._started_at = 0.0
+
+    def __enter__(self) -> None:
+        self._started_at = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self._spans.append(
+            (self._name, (time.perf_counter() - self._started_at) * 1000)
+        )
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *args: object) -> None:
+        return None
+
+
+_NO_SPAN: Final = _NoSpan()
+
+
+def span(name: str) -> _Span | _NoSpan:
+    """Times a stage of the current request: `with span("redis_lookup"): ...`.
+
+    Costs one context variable lookup while timing is off. Tasks created
+    inside the request share its span list, so concurrent stages (e.g. LLM
+    variants) are all recorded."""
+    spans = _spans.get()
+    if spans is None:
+        return _NO_SPAN
+    return _Span(name, spans)
+
+
+@contextlib.contextmanager
+def timing_scope() -> Iterator[list[tuple[str, float]]]:
+    """Turns timing on for the code inside; yields the recorded spans."""
+    spans: list[tuple[str, float]] = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+def server_timing_header(spans: list[tuple[str, float]], total_ms: float) -> str:
+    return ", ".join(
+        [*(f"{name};dur={ms:0.2f}" for name, ms in spans), f"total;dur={total_ms:0.2f}"]
+    )
+
+
+def timing_log_fields(spans: list[tuple[str, float]]) -> dict[str, str]:
+    """`timing_<stage>_ms` per stage, repeated stages summed."""
+    totals: dict[str, float] = {}
+    for name, ms in spans:
+        totals[name] = totals.get(name, 0.0) + ms
+    return {f"timing_{name}_ms": f"{ms:0.2f}" for name, ms in totals.items()}
@@ -0,0 +1,123 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterator
+from types import SimpleNamespace
+from typing import Any
+
+import fakeredis.aioredis
+import pytest
+
+from src.app_api.models.request_models.request_info import (
+    LLMRequestParametersApiMdl,
+    PromptRequestApiMdl,
+)
+from src.dto.llm_info import Exclude
+from src.service_llm import circuit_breaker, llm_manager
+from src.service_llm.llm_clients import registry
+from src.service_llm.prompt_cache import prompt_cache
+from src.service_llm.provider_scheduler import estimate_tokens
+
+
+class FakeLLM:
+    """Stands in for every provider client.
+
+    Prompts rendered from the `prompt` template are answered with
+    `reply(text)`, the text upper-cased by default; an exception returned by
+    `reply` is raised instead. Every text sent is kept in `texts`."""
+
+    chunk_size = 3
+
+    def __init__(self) -> None:
+        self.texts: list[str] = []
+        self.reply: Callable[[str], str | BaseException] = str.upper
+
+    def _answer(self, prompt: str) -> str | BaseException:
+        text = prompt.split(": ", 1)[-1]
+        self.texts.append(text)
+        return self.reply(text)
+
+    async def ainvoke(self, prompt: str) -> Any:
+        reply = self._answer(prompt)
+        if isinstance(reply, BaseException):
+            raise reply
+        return SimpleNamespace(
+            content=reply,
+            usage_metadata={
+                "input_tokens": estimate_tokens(prompt),
+                "output_tokens": estimate_tokens(reply),
+            },
+        )
+
+    async def astream(self, prompt: str) -> AsyncIterator[Any]:
+        """Sends the reply `chunk_size` characters at a time, yielding to
+        other streams between chunks; a failing one sends its first chunk
+        before raising."""
+        reply = self._answer(prompt)
+        if isinstance(reply, BaseException):
+            yield SimpleNamespace(content="...", usage_metadata=None)
+            await asyncio.sleep(0)
+            raise reply
+        for start in range(0, len(reply), self.chunk_size):
+            last = start + self.chunk_size >= len(reply)
+            yield SimpleNamespace(
+                content=reply[start : start + self.chunk_size],
+                usage_metadata={
+                    "input_tokens": estimate_tokens(prompt),
+                    "output_tokens": estimate_tokens(reply),
+                }
+                if last
+                else None,
+            )
+            await asyncio.sleep(0)
+
+
+@pytest.fixture(autouse=True)
+def _reset_worker_state() -> Iterator[None]:
+    """Worker-global caches would leak templates, flights and open circuits
+    from one test into the next."""
+    yield
+    prompt_cache.clear()
+    llm_manager._flights._calls.clear()  # noqa: SLF001
+    circuit_breaker._breakers.clear()  # noqa: SLF001
+
+
+@pytest.fixture
+def rds() -> fakeredis.aioredis.FakeRedis:
+    return fakeredis.aioredis.FakeRedis()
+
+
+@pytest.fixture
+def fake_llm(monkeypatch: pytest.MonkeyPatch) -> FakeLLM:
+    llm = FakeLLM()
+    monkeypatch.setattr(registry, "llm", lambda provider, temperature: llm)
+    return llm
+
+
+@pytest.fixture
+def prompt(rds: fakeredis.aioredis.FakeRedis) -> int:
+    """Id of a stored prompt whose template is `{lang_abbr}: {text}`."""
+    prompt_id = 1
+    asyncio.run(
+        llm_manager.create_prompt(
+            PromptRequestApiMdl(
+                prompt_id=prompt_id, prompt_template="{lang_abbr}: {text}"
+            ),
+            rds,
+            log_extra={},
+        )
+    )
+    return prompt_id
+
+
+@pytest.fixture
+def make_params() -> Callable[..., LLMRequestParametersApiMdl]:
+    def _make(text: str = "hello", **update: Any) -> LLMRequestParametersApiMdl:
+        params = LLMRequestParametersApiMdl(
+            text=text,
+            context="",
+            exclude=Exclude(exception="", exceptions_list=[]),
+            variants=1,
+            temperature=0,
+        )
+        return params.model_copy(update=update)
+
+    return _make
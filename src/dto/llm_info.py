@@ -1,7 +1,14 @@
+import string
+from functools import cached_property
 from enum import Enum, StrEnum, unique
+from typing import Final
 
 from pydantic import BaseModel
 
+from src.errors import PromptTemplateError
+
+PROMPT_PLACEHOLDERS: Final = ("lang_abbr", "text", "context", "exclude")
+
 
 @unique
 class Source(Enum):
@@ -48,10 +55,64 @@ class Exclude(BaseModel):
     # ["some workds 1:1 as in text", "yet onother"]
 
 
+class PromptTemplate:
+    """A prompt template parsed once: literal text and placeholder names in
+    order, so rendering is a plain join with no format parsing."""
+
+    __slots__ = ("_parts",)
+
+    def __init__(self, parts: tuple[tuple[str, str | None], ...]) -> None:
+        self._parts = parts
+
+    def render(self, text: str, context: str, exclude: str, lang_abbr: str) -> str:
+        values = {
+            "lang_abbr": lang_abbr,
+            "text": text,
+            "context": context,
+            "exclude": exclude,
+        }
+        return "".join(
+            literal if field is None else f"{literal}{values[field]}"
+            for literal, field in self._parts
+        )
+
+
+def compile_prompt_template(template: str, require_text: bool = True) -> PromptTemplate:
+    """Parses `template` with `str.format` syntax. Only plain `{name}`
+    placeholders from `PROMPT_PLACEHOLDERS` are allowed; literal braces are
+    written `{{` and `}}`. `{text}` is required unless `require_text` is
+    off, for templates stored before it was."""
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError as e:
+        raise PromptTemplateError(f"prompt_template is malformed: {e}") from e
+    parts: list[tuple[str, str | None]] = []
+    for literal, field, format_spec, conversion in parsed:
+        if field is not None:
+            if field not in PROMPT_PLACEHOLDERS:
+                raise PromptTemplateError(
+                    f"prompt_template has an unknown placeholder {{{field}}}, "
+                    f"allowed: {', '.join(PROMPT_PLACEHOLDERS)}"
+                )
+            if format_spec or conversion:
+                raise PromptTemplateError(
+                    f"prompt_template placeholder {{{field}}} can not have "
+                    "a conversion or format spec"
+                )
+        parts.append((literal, field))
+    if require_text and not any(field == "text" for _, field in parts):
+        raise PromptTemplateError("prompt_template has no {text} placeholder")
+    return PromptTemplate(tuple(parts))
+
+
 class Prompt(BaseModel):
     prompt_id: int
     version: str
     prompt_template: str
 
+    @cached_property
+    def compiled_template(self) -> PromptTemplate:
+        return compile_prompt_template(self.prompt_template, require_text=False)
+
     def get_prompt(self, text: str, context: str, exclude: str, lang_abbr: str) -> str:
-        return f"{self.prompt_template.format(lang_abbr=lang_abbr, text=text, context=context, exclude=exclude)}"
+        return self.compiled_template.render(text, context, exclude, lang_abbr)
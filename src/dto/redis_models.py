@@ -11,11 +11,21 @@ class RedisTask(Enum):
 class RedisChannels(Enum):
     TG_PARSER = "tg_parser"
     TG_TASKS = "tg_tasks"
+    PROMPT_INVALIDATION = "prompt_invalidation"
 
 
 class RedisNamespace(Enum):
     DT_TO = "dt_to"
     DT_FROM = "dt_from"
+    LLM_CACHE = "llm_cache"
+    LLM_CACHE_INDEX = "llm_cache_index"
+    LLM_FLIGHT_LOCK = "llm_flight"
+    PROMPT_LATEST = "prompt_latest"
+    LLM_RATE = "llm_rate"
+    LLM_USAGE = "llm_usage"
+    LLM_USAGE_INDEX = "llm_usage_index"
+    LLM_JOB = "llm_job"
+    LLM_MEMORY = "llm_memory"
 
 
 def source_channel_name_dt_now(source: Source, channel_name: str):
@@ -0,0 +1,38 @@
+import pytest
+
+from src.dto.llm_info import Prompt, compile_prompt_template
+from src.errors import PromptTemplateError
+
+
+def test_compile_prompt_template() -> None:
+    template = compile_prompt_template(
+        "To {lang_abbr} ({context}), keep {exclude}: {text} {{json}}"
+    )
+    assert template.render("hi", "chat", "names", "de") == (
+        "To de (chat), keep names: hi {json}"
+    )
+
+    for broken in [
+        "{text} {name}",
+        "{text} {}",
+        "{text!r}",
+        "{text:>10}",
+        "{text.upper}",
+        "{text",
+        "no placeholder",
+    ]:
+        with pytest.raises(PromptTemplateError):
+            compile_prompt_template(broken)
+    assert (
+        compile_prompt_template("hi {lang_abbr}", require_text=False).render(
+            "", "", "", "de"
+        )
+        == "hi de"
+    )
+
+
+def test_prompt_compiles_once() -> None:
+    prompt = Prompt(prompt_id=1, version="1v0", prompt_template="{lang_abbr}: {text}")
+    assert prompt.get_prompt("hi", "", "", "de") == "de: hi"
+    assert prompt.compiled_template is prompt.compiled_template
+    assert "compiled_template" not in prompt.model_dump()
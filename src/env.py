@@ -46,6 +46,9 @@ class LogLevel(Enum):
 class Settings(BaseSettings):
     ROOT_PATH: Path = ROOT_PATH
     LOG_LVL: LogLevel = LogLevel.INFO
+    LOG_QUEUE: bool = True  # format and write records on a background thread
+    LOG_DEBUG_SAMPLE_EVERY: int = 1  # keep 1 of N debug records per message
+    SERVER_TIMING: bool = False  # per-stage spans in Server-Timing and logs
 
     SENTRY_DSN: str = ""
 
@@ -66,6 +69,82 @@ class Settings(BaseSettings):
 
     REDIS_HOST: SecretStr = SecretStr("")
     REDIS_PORT: SecretStr = SecretStr("")
+    REDIS_MAX_CONNECTIONS: int = 64
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    DEEPSEEK_BASE_URL: str = "https://api.deepseek.com/v1"
+    DEEPSEEK_MODEL: str = "deepseek-chat"
+
+    # USD per 1M tokens, used for cost estimates only
+    OPENAI_PRICE_INPUT_1M: float = 0.15
+    OPENAI_PRICE_OUTPUT_1M: float = 0.60
+    DEEPSEEK_PRICE_INPUT_1M: float = 0.27
+    DEEPSEEK_PRICE_OUTPUT_1M: float = 1.10
+
+    OPENAI_RPM: int = 500
+    OPENAI_TPM: int = 200_000
+    OPENAI_MAX_CONCURRENCY: int = 32
+    DEEPSEEK_RPM: int = 500
+    DEEPSEEK_TPM: int = 200_000
+    DEEPSEEK_MAX_CONCURRENCY: int = 32
+
+    LLM_MAX_TOKENS: int = 1024
+    LLM_MAX_RETRIES: int = 3
+    LLM_BACKOFF_BASE_S: float = 0.5
+    LLM_BACKOFF_MAX_S: float = 20.0
+    LLM_RATE_LIMIT_SHARED: bool = False
+
+    BREAKER_WINDOW_S: float = 30.0
+    BREAKER_MIN_CALLS: int = 10
+    BREAKER_ERROR_RATE: float = 0.5
+    BREAKER_OPEN_S: float = 30.0
+    BREAKER_HALF_OPEN_CALLS: int = 2
+
+    HEDGE_LATENCY_WINDOW: int = 200
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_DEFAULT_DELAY_S: float = 10.0
+    HEDGE_MIN_DELAY_S: float = 0.5
+    LLM_VARIANTS_CONCURRENCY: int = 4
+    # chunked=true: segment size of long texts, keep the translation of one
+    # segment well under LLM_MAX_TOKENS
+    LLM_SEGMENT_MAX_TOKENS: int = 400
+    LLM_SEGMENT_CONCURRENCY: int = 8
+    LLM_MEMORY_TTL_S: int = 30 * 24 * 60 * 60  # translation_memory=true
+    LLM_BATCH_CONCURRENCY: int = 16
+    LLM_BATCH_MAX_ITEMS: int = 64
+    LLM_HTTP_TIMEOUT: float = 60.0
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 90.0
+    LLM_WARMUP: bool = True
+    LLM_CACHE_TTL_S: int = 7 * 24 * 60 * 60
+    LLM_CACHE_MAX_ENTRIES: int = 200_000
+
+    LLM_USAGE_TTL_DAYS: int = 400
+    LLM_USAGE_MAX_QUERY_DAYS: int = 92
+
+    SINGLE_FLIGHT_TIMEOUT_S: float = 120.0
+    SINGLE_FLIGHT_REDIS_LOCK: bool = False
+    SINGLE_FLIGHT_LOCK_TTL_S: float = 120.0
+    SINGLE_FLIGHT_POLL_S: float = 0.05
+
+    JOB_QUEUE: str = "llm_jobs"
+    JOB_TTL_S: int = 24 * 60 * 60
+    JOB_MAX_ATTEMPTS: int = 4
+    JOB_RETRY_BACKOFF_S: float = 5.0
+    JOB_MAX_WAIT_S: float = 30.0
+    JOB_POLL_S: float = 0.25
+    # must outlast the longest job, or the broker redelivers it mid-run
+    JOB_VISIBILITY_TIMEOUT_S: int = 60 * 60
+
+    PROMPT_CACHE_MAX_SIZE: int = 1024
+    PROMPT_CACHE_TTL_S: float = 300.0
+    LLM_WARMUP_TIMEOUT: float = 5.0
 
     @property
     def is_local(self) -> bool:
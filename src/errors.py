@@ -1,6 +1,10 @@
 from typing import Any
 
 
+class PromptTemplateError(ValueError):
+    """A prompt template that cannot be rendered; rejected when written."""
+
+
 def fmt_err(err: Exception | str | None, tb: Any = None) -> str:
     if isinstance(err, Exception):
         tb = f"\n\n{tb}" if tb else ""
@@ -1,10 +1,15 @@
+import atexit
 import contextlib
+import functools
 import logging
+import queue
 import time
 import warnings
+from collections import OrderedDict
 from collections.abc import Iterator
 from datetime import datetime
 from enum import Enum
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Any, Final
 
@@ -69,6 +74,7 @@ _LVL_NAME_MAP = {
 
 
 STARTED_AT = datetime.now()
+_STARTED_AT_TS: Final = STARTED_AT.timestamp()
 _log_def_keys = {
     "name",
     "msg",
@@ -92,6 +98,7 @@ _log_def_keys = {
     "threadName",
     "processName",
     "process",
+    "taskName",
     "message",
     "req_id",
     "req_status",
@@ -99,19 +106,29 @@ _log_def_keys = {
 }
 
 
+@functools.cache
+def _record_name(name: str, levelno: int) -> str:
+    if name.startswith("src."):
+        return f"./{'/'.join(name.split('.'))}.py:{levelno}"
+    if name == "__main__":
+        import __main__
+
+        return f"{Path(__main__.__file__).relative_to(ROOT_PATH)}:{levelno}"
+    return f"{name}:{levelno}"
+
+
 class ExFormatter(logging.Formatter):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__("%(asctime)s", "%Y-%m-%d %H:%M:%S")
 
     def format(self, record: logging.LogRecord) -> str:
-        try:
-            dt = datetime.strptime(super().format(record), "%Y-%m-%d %H:%M:%S")
-            at = str(int((max(STARTED_AT, dt) - STARTED_AT).total_seconds() * 10))
-        except Exception:
-            at = "N/A"
+        record.message = record.getMessage()
+        # tenths of a second since start, straight from the record timestamp
+        at = str(int(max(0.0, record.created - _STARTED_AT_TS) * 10))
 
         req_data = record.__dict__
-        extra = {k: v for k, v in req_data.items() if k not in _log_def_keys}
+        extra_keys = req_data.keys() - _log_def_keys
+        extra = {k: req_data[k] for k in extra_keys} if extra_keys else {}
         req_id = req_data.get("req_id", "")
         try:
             req_status = int(req_data.get("req_status", "-22"))
@@ -136,15 +153,7 @@ class ExFormatter(logging.Formatter):
         elif 400 <= req_status < 500:
             status_code_fmt = f"{FG.DARK_yellow}{req_status}{FG.Default}"
 
-        rec_name = f"{record.name}:{record.levelno}"
-        if record.name.startswith("src."):
-            rec_name = f"./{'/'.join(record.name.split('.'))}.py:{record.levelno}"
-        elif record.name == "__main__":
-            import __main__
-
-            rec_name = (
-                f"{Path(__main__.__file__).relative_to(ROOT_PATH)}:{record.levelno}"
-            )
+        rec_name = _record_name(record.name, record.levelno)
 
         extra_fmt = f" :: {extra}" if len(extra) > 0 else ""
         ln_start = "\n\n" if req_started else ""
@@ -155,12 +164,60 @@ class ExFormatter(logging.Formatter):
             if req_ended
             else ""
         )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        exc_fmt = f"\n{record.exc_text}" if record.exc_text else ""
         return (
             f"{ln_start}{_LVL_COLOR_MAP[record.levelno]}{_LVL_NAME_MAP[record.levelno]} {at[-5:]:0>5}"
-            f"|{req_mark} {rec_name} |{FG.Default} {record.message}{extra_fmt}{ln_end}"
+            f"|{req_mark} {rec_name} |{FG.Default} {record.message}{extra_fmt}{exc_fmt}{ln_end}"
         )
 
 
+class DebugSampler(logging.Filter):
+    """Keeps 1 of `every` DEBUG records per message template; request
+    start/end lines of `scope` and other levels always pass. Counters are
+    kept for the `max_templates` most recently seen templates."""
+
+    def __init__(self, every: int, max_templates: int = 1024) -> None:
+        super().__init__()
+        self._every = max(1, every)
+        self._max_templates = max_templates
+        self._seen: OrderedDict[Any, int] = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self._every == 1 or record.levelno != logging.DEBUG:
+            return True
+        if "req_status" in record.__dict__:
+            return True
+        # messages that are not templates are grouped by type
+        key = record.msg if isinstance(record.msg, str) else type(record.msg)
+        seen = self._seen.pop(key, 0)
+        self._seen[key] = seen + 1
+        if len(self._seen) > self._max_templates:
+            self._seen.popitem(last=False)
+        return seen % self._every == 0
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Enqueues records as they are: unlike `QueueHandler.prepare` nothing is
+    formatted on the logging thread, `%` args are rendered by the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_queue_listener: QueueListener | None = None
+
+
+def _queued(handler: logging.Handler) -> logging.Handler:
+    global _queue_listener  # noqa: PLW0603
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    _queue_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _queue_listener.start()
+    atexit.register(_queue_listener.stop)
+    return _LazyQueueHandler(log_queue)
+
+
 format = "%(asctime)s %(levelname)s %(name)s %(module)s:%(lineno)s %(message)s"
 json_formatter = jsonlogger.JsonFormatter(format)  # type: ignore
 local_text_formatter = ExFormatter()
@@ -174,16 +231,23 @@ def setup_logging(log_lvl: LogLevel = settings.LOG_LVL) -> None:
     _logger_was_initialized = True
 
     logHandler = logging.StreamHandler()
+    logHandler.setFormatter(
+        local_text_formatter
+        if settings.is_testing or settings.is_local
+        else json_formatter
+    )
+    handler: logging.Handler = logHandler
+    if settings.LOG_QUEUE and not settings.is_testing:
+        handler = _queued(logHandler)
+    handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_EVERY))
 
     if settings.is_testing or settings.is_local:
-        logHandler.setFormatter(local_text_formatter)
         logging.basicConfig(
-            level=logging.INFO, format="%(asctime)s", handlers=[logHandler]
+            level=logging.INFO, format="%(asctime)s", handlers=[handler]
         )
         logging.getLogger("src").setLevel(logging.DEBUG)
     else:
-        logHandler.setFormatter(json_formatter)
-        logging.basicConfig(level=logging.WARNING, format=format, handlers=[logHandler])
+        logging.basicConfig(level=logging.WARNING, format=format, handlers=[handler])
         logging.getLogger("src").setLevel(getattr(logging, log_lvl.value))
 
     logging.getLogger("databases").setLevel(logging.ERROR)
@@ -224,7 +288,7 @@ def scope(
         log_extra["req_status"] = "500"
         raise
     finally:
-        log_extra["req_duration"] = f"{time.time() - started_at:0.5f}"
+        log_extra["req_duration"] = f"{time.monotonic() - started_at:0.5f}"
         try:
             status = int(str(log_extra.get("req_status", "-1") or "-2"))
         except Exception:
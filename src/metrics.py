@@ -0,0 +1,131 @@
+import os
+import time
+from typing import Any, Final
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# With several workers set PROMETHEUS_MULTIPROC_DIR to an empty directory
+# shared by them (and wiped on deploy): every worker then writes its samples
+# to mmap files there and /metrics aggregates the files.
+MULTIPROC_DIR: Final = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "")
+
+_LLM_BUCKETS: Final = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+_REDIS_BUCKETS: Final = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+REQUEST_LATENCY: Final = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response body is sent",
+    ["method", "route", "status"],
+)
+LLM_LATENCY: Final = Histogram(
+    "llm_call_duration_seconds",
+    "Provider call latency, one sample per attempt",
+    ["provider", "model", "outcome"],
+    buckets=_LLM_BUCKETS,
+)
+LLM_IN_FLIGHT: Final = Gauge(
+    "llm_calls_in_flight",
+    "Provider calls holding a concurrency slot",
+    ["provider", "model"],
+    multiprocess_mode="livesum",
+)
+CACHE_LOOKUPS: Final = Counter(
+    "llm_cache_lookups_total",
+    "Response cache lookups by cache_key kind",
+    ["kind", "result"],
+)
+PROMPT_ERRORS: Final = Counter(
+    "llm_prompt_errors_total",
+    "Queries that failed on the prompt before reaching a provider",
+    ["reason"],
+)
+REDIS_LATENCY: Final = Histogram(
+    "redis_command_duration_seconds",
+    "Redis command latency; pipelines are one sample",
+    ["command"],
+    buckets=_REDIS_BUCKETS,
+)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class TimedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        started_at = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_LATENCY.labels(command="PIPELINE").observe(
+                time.perf_counter() - started_at
+            )
+
+
+class TimedRedis(Redis):
+    """Redis client recording per-command latency."""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started_at = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(command=str(args[0]).upper()).observe(
+                time.perf_counter() - started_at
+            )
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> Pipeline:
+        return TimedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: observes latency per route template, so path
+    parameters do not blow up label cardinality, and never buffers bodies."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started_at = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            if route != "/metrics":
+                REQUEST_LATENCY.labels(
+                    method=scope["method"], route=route, status=str(status)
+                ).observe(time.perf_counter() - started_at)
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from enum import StrEnum
+from types import TracebackType
+from typing import Any, Final, TypeVar
+
+import openai
+
+from src.dto.llm_info import Provider
+from src.env import settings
+from src.service_llm.llm_clients import client_settings
+
+logger: Final = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# provider outages; rate limits and bad requests mean the provider is up
+_BREAKER_FAILURES: Final = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    TimeoutError,
+)
+
+
+class BreakerState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker for one provider model.
+
+    Closed: calls pass, outcomes of the last `BREAKER_WINDOW_S` seconds are
+    kept and the breaker opens once at least `BREAKER_MIN_CALLS` of them
+    failed at `BREAKER_ERROR_RATE` or more. Open: calls fail fast for
+    `BREAKER_OPEN_S`. Half-open: a few probe calls decide between the two."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._state = BreakerState.CLOSED
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> BreakerState:
+        if (
+            self._state == BreakerState.OPEN
+            and time.monotonic() - self._opened_at >= settings.BREAKER_OPEN_S
+        ):
+            self._transition(BreakerState.HALF_OPEN)
+        return self._state
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == BreakerState.CLOSED:
+            return
+        if (
+            state == BreakerState.HALF_OPEN
+            and self._probes < settings.BREAKER_HALF_OPEN_CALLS
+        ):
+            self._probes += 1
+            return
+        retry_in = max(
+            0.0, self._opened_at + settings.BREAKER_OPEN_S - time.monotonic()
+        )
+        raise CircuitOpenError(
+            f"circuit {state.value} for {self.name}, retry in {retry_in:0.0f}s"
+        )
+
+    def on_success(self) -> None:
+        if self._state == BreakerState.HALF_OPEN:
+            self._transition(BreakerState.CLOSED)
+            return
+        self._record(True)
+
+    def on_failure(self, err: BaseException) -> None:
+        if not isinstance(err, _BREAKER_FAILURES):
+            return self.on_success()
+        if self._state == BreakerState.HALF_OPEN:
+            self._transition(BreakerState.OPEN)
+            return
+        self._record(False)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if (
+            len(self._outcomes) >= settings.BREAKER_MIN_CALLS
+            and failures / len(self._outcomes) >= settings.BREAKER_ERROR_RATE
+        ):
+            self._transition(BreakerState.OPEN)
+
+    def on_cancel(self) -> None:
+        # a cancelled probe (e.g. a hedging loser) proves nothing either way
+        if self._state == BreakerState.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    async def __aenter__(self) -> "CircuitBreaker":
+        self.before_call()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if exc is None:
+            self.on_success()
+        elif isinstance(exc, asyncio.CancelledError):
+            self.on_cancel()
+        else:
+            self.on_failure(exc)
+
+    def snapshot(self) -> dict[str, Any]:
+        self._trim(time.monotonic())
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return {
+            "state": self.state.value,
+            "calls": len(self._outcomes),
+            "error_rate": failures / len(self._outcomes) if self._outcomes else 0.0,
+        }
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - settings.BREAKER_WINDOW_S:
+            self._outcomes.popleft()
+
+    def _transition(self, state: BreakerState) -> None:
+        logger.warning(
+            "circuit_breaker :: %s %s -> %s",
+            self.name,
+            self._state.value,
+            state.value,
+        )
+        self._state = state
+        self._probes = 0
+        if state == BreakerState.OPEN:
+            self._opened_at = time.monotonic()
+        elif state == BreakerState.CLOSED:
+            self._outcomes.clear()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(provider: Provider) -> CircuitBreaker:
+    cfg = client_settings(provider)
+    name = f"{cfg.provider.value}/{cfg.model}"
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+async def guarded(breaker: CircuitBreaker, func: Callable[[], Awaitable[T]]) -> T:
+    """Runs `func` through `breaker`; raises CircuitOpenError without calling it
+    while the circuit is open, so provider routing can fail over right away."""
+    async with breaker:
+        return await func()
+
+
+def breakers_snapshot() -> dict[str, dict[str, Any]]:
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
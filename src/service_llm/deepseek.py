@@ -1,17 +1,17 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
-from src.common.async_utils import sync_to_async
+from src.dto.llm_info import Provider
 from src.env import settings
+from src.service_llm.llm_clients import registry
 
 
-@sync_to_async
-def prompt(client: OpenAI, prompt: str) -> str:
-    client_s = OpenAI(
-        api_key=settings.DEEPSEEK_API_KEY.get_secret_value(),
-        base_url="https://api.deepseek.com",
-    )
-    response = client_s.chat.completions.create(
-        model="deepseek-chat",
+async def prompt(client: AsyncOpenAI | OpenAI | None, prompt: str) -> str:
+    """Any client that is not an `AsyncOpenAI` (callers used to pass a sync
+    one, which was never used) falls back to the shared DeepSeek client."""
+    if not isinstance(client, AsyncOpenAI):
+        client = registry.sdk(Provider.deepseek)
+    response = await client.chat.completions.create(
+        model=settings.DEEPSEEK_MODEL,
         messages=[
             {"role": "user", "content": prompt},
         ],
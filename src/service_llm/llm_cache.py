@@ -0,0 +1,264 @@
+import ast
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import secrets
+import time
+import unicodedata
+from typing import Final, Literal
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from src.app_api.models.request_models.request_info import LLMRequestParametersApiMdl
+from src.app_api.models.response_models.response_info import ResponseLLMApiMdl
+from src.common.async_utils import spawn
+from src.common.redis_utils import LuaScript
+from src.dto.llm_info import Provider
+from src.dto.redis_models import RedisNamespace
+from src.env import settings
+from src.service_llm.llm_clients import client_settings
+
+logger: Final = logging.getLogger(__name__)
+
+AUTO_CACHE_PREFIX: Final = f"{RedisNamespace.LLM_CACHE.value}:"
+_SPACES: Final = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode form and whitespace only: case, punctuation and every word
+    can change the translation, so they stay."""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def auto_cache_key(
+    prompt_id: int,
+    llm_query_params: LLMRequestParametersApiMdl,
+    provider: Provider,
+    lang_abbr: str,
+    normalized: bool = False,
+) -> str:
+    """Content address of everything that changes the generated output.
+
+    With `normalized` the text is addressed by `normalize_text`, so texts
+    differing only in spacing or Unicode form share one entry."""
+    cfg = client_settings(provider)
+    text = llm_query_params.text
+    identity = json.dumps(
+        [
+            f"{prompt_id}v{llm_query_params.prompt_version_id}",
+            normalize_text(text) if normalized else text,
+            llm_query_params.context,
+            llm_query_params.exclude.exception,
+            sorted(llm_query_params.exclude.exceptions_list),
+            lang_abbr,
+            cfg.provider.value,
+            cfg.model,
+            cfg.max_tokens,
+            llm_query_params.temperature,
+            llm_query_params.variants,
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return f"{AUTO_CACHE_PREFIX}{hashlib.sha256(identity.encode('utf-8')).hexdigest()}"
+
+
+def is_auto_cache_key(cache_key: str) -> bool:
+    return cache_key.startswith(AUTO_CACHE_PREFIX)
+
+
+class _CacheRecordV1(BaseModel):
+    v: Literal[1] = 1
+    r: ResponseLLMApiMdl
+
+
+def encode_cached_response(response: ResponseLLMApiMdl) -> bytes:
+    """Versioned JSON record stored as a plain string, read with one GET."""
+    # usage describes the original generation, a cache hit costs nothing
+    return (
+        _CacheRecordV1(r=response)
+        .model_dump_json(exclude={"r": {"usage", "memory_hit_ratio"}})
+        .encode("utf-8")
+    )
+
+
+def decode_cached_response(raw: bytes) -> ResponseLLMApiMdl:
+    return _CacheRecordV1.model_validate_json(raw).r
+
+
+def decode_legacy_cached_response(response: dict[bytes, bytes]) -> ResponseLLMApiMdl:
+    """Hash records written before the versioned format existed."""
+    return ResponseLLMApiMdl(
+        prompt_id=response[b"prompt_id"].decode("utf-8"),  # type: ignore
+        translations=ast.literal_eval(response[b"translations"].decode("utf-8")),
+        error=response[b"error"].decode("utf-8"),
+        provider=response[b"provider"].decode("utf-8"),  # type: ignore
+        created_at=response[b"created_at"].decode("utf-8"),  # type: ignore
+    )
+
+
+def _is_wrong_type(err: Exception) -> bool:
+    return isinstance(err, ResponseError) and str(err).startswith("WRONGTYPE")
+
+
+def migrate_legacy_record(
+    cache_key: str, record: dict[bytes, bytes], rds: Redis
+) -> ResponseLLMApiMdl:
+    """Decodes a legacy hash record and rewrites it in the background."""
+    response = decode_legacy_cached_response(record)
+    spawn(rds.set(cache_key, encode_cached_response(response), keepttl=True))
+    return response
+
+
+async def _migrate_legacy(cache_key: str, rds: Redis) -> ResponseLLMApiMdl | None:
+    record = await rds.hgetall(cache_key)  # type: ignore
+    if not record:
+        return None
+    return migrate_legacy_record(cache_key, record, rds)
+
+
+async def get_cached_response(
+    cache_key: str, rds: Redis, log_extra: dict[str, str]
+) -> ResponseLLMApiMdl | None:
+    try:
+        raw = await rds.get(cache_key)
+    except ResponseError as e:
+        if not _is_wrong_type(e):
+            raise
+        logger.debug(
+            "create_query :: legacy hash record, migrating cache_key: %s",
+            cache_key,
+            extra=log_extra,
+        )
+        return await _migrate_legacy(cache_key, rds)
+    if raw is None:
+        return None
+    logger.debug(
+        "create_query :: cache_key is exist. cache_key: %s",
+        cache_key,
+        extra=log_extra,
+    )
+    return decode_cached_response(raw)
+
+
+async def get_cached_responses(
+    cache_keys: list[str], rds: Redis
+) -> list[ResponseLLMApiMdl | None]:
+    async with rds.pipeline(transaction=False) as pipe:
+        for cache_key in cache_keys:
+            pipe.get(cache_key)
+        records = await pipe.execute(raise_on_error=False)
+
+    responses: list[ResponseLLMApiMdl | None] = []
+    for cache_key, raw in zip(cache_keys, records):
+        if isinstance(raw, Exception):
+            if not _is_wrong_type(raw):
+                raise raw
+            responses.append(await _migrate_legacy(cache_key, rds))
+        else:
+            responses.append(decode_cached_response(raw) if raw is not None else None)
+    return responses
+
+
+def is_cacheable(response: ResponseLLMApiMdl) -> bool:
+    """Only complete successes are stored: a cached error or timeout would
+    be served to every identical request for the whole TTL."""
+    return not response.error and bool(response.translations)
+
+
+async def set_cached_responses(
+    items: list[tuple[str, ResponseLLMApiMdl]], rds: Redis
+) -> None:
+    """Stores responses; automatic keys get a TTL and a bounded namespace.
+
+    Every automatic key is indexed in a sorted set by write time. Entries
+    past their TTL are dropped from the index, and when the index grows
+    beyond `LLM_CACHE_MAX_ENTRIES` the oldest keys are evicted."""
+    now = time.time()
+    index = RedisNamespace.LLM_CACHE_INDEX.value
+    auto_keys: dict[str, float] = {}
+    async with rds.pipeline(transaction=False) as pipe:
+        for cache_key, response in items:
+            if is_auto_cache_key(cache_key):
+                pipe.set(
+                    cache_key,
+                    encode_cached_response(response),
+                    ex=settings.LLM_CACHE_TTL_S,
+                )
+                auto_keys[cache_key] = now
+            else:
+                pipe.set(cache_key, encode_cached_response(response))
+        if auto_keys:
+            pipe.zadd(index, auto_keys)
+            pipe.zremrangebyscore(index, "-inf", now - settings.LLM_CACHE_TTL_S)
+            pipe.zcard(index)
+        results = await pipe.execute()
+    if not auto_keys:
+        return
+
+    overflow = int(results[-1]) - settings.LLM_CACHE_MAX_ENTRIES
+    if overflow <= 0:
+        return
+    evicted = [key for key, _ in await rds.zpopmin(index, overflow)]
+    if evicted:
+        await rds.unlink(*evicted)
+        logger.debug("llm_cache :: evicted %s entries", len(evicted))
+
+
+async def set_cached_response(
+    cache_key: str, response: ResponseLLMApiMdl, rds: Redis
+) -> None:
+    await set_cached_responses([(cache_key, response)], rds)
+
+
+def _flight_lock_key(cache_key: str) -> str:
+    return f"{RedisNamespace.LLM_FLIGHT_LOCK.value}:{cache_key}"
+
+
+# deletes the lock only while it still holds our token, so a holder whose
+# lock expired cannot release the next holder's
+_RELEASE_FLIGHT_LOCK: Final = LuaScript(
+    """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+)
+
+
+async def acquire_flight_lock(cache_key: str, rds: Redis) -> str | None:
+    """Cross-worker single-flight: only the lock holder calls the provider.
+
+    Returns the holder's token for `release_flight_lock`, or None."""
+    token = secrets.token_hex(16)
+    acquired = await rds.set(
+        _flight_lock_key(cache_key),
+        token,
+        nx=True,
+        px=int(settings.SINGLE_FLIGHT_LOCK_TTL_S * 1000),
+    )
+    return token if acquired else None
+
+
+async def release_flight_lock(cache_key: str, token: str, rds: Redis) -> None:
+    await _RELEASE_FLIGHT_LOCK(rds, keys=[_flight_lock_key(cache_key)], args=[token])
+
+
+async def wait_cached_response(
+    cache_key: str, rds: Redis, log_extra: dict[str, str]
+) -> ResponseLLMApiMdl | None:
+    """Polls for the lock holder's result; None once the lock is gone."""
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT_S
+    while time.monotonic() < deadline:
+        # lock first: the holder writes the cache before releasing it
+        locked = await rds.exists(_flight_lock_key(cache_key))
+        cached = await get_cached_response(cache_key, rds, log_extra)
+        if cached is not None or not locked:
+            return cached
+        await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_S)
+    raise asyncio.TimeoutError(f"no result for {cache_key} from other worker")
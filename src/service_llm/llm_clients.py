@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Final
+
+import httpx
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI
+
+from src.dto.llm_info import Provider
+from src.env import settings
+from src.errors import fmt_err
+
+logger: Final = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LLMClientSettings:
+    provider: Provider
+    model: str
+    base_url: str
+    api_key: str
+    max_tokens: int
+    price_input_1m: float = 0.0
+    price_output_1m: float = 0.0
+
+
+def client_settings(provider: Provider) -> LLMClientSettings:
+    match provider:
+        case Provider.deepseek:
+            return LLMClientSettings(
+                provider=Provider.deepseek,
+                model=settings.DEEPSEEK_MODEL,
+                base_url=settings.DEEPSEEK_BASE_URL,
+                api_key=settings.DEEPSEEK_API_KEY.get_secret_value(),
+                max_tokens=settings.LLM_MAX_TOKENS,
+                price_input_1m=settings.DEEPSEEK_PRICE_INPUT_1M,
+                price_output_1m=settings.DEEPSEEK_PRICE_OUTPUT_1M,
+            )
+        # case Provider.claude: not wired yet, falls back to openai
+        case _:
+            return LLMClientSettings(
+                provider=Provider.openai,
+                model=settings.OPENAI_MODEL,
+                base_url=settings.OPENAI_BASE_URL,
+                api_key=settings.OPENAI_API_KEY.get_secret_value(),
+                max_tokens=settings.LLM_MAX_TOKENS,
+                price_input_1m=settings.OPENAI_PRICE_INPUT_1M,
+                price_output_1m=settings.OPENAI_PRICE_OUTPUT_1M,
+            )
+
+
+class LLMClientRegistry:
+    """Long-lived provider clients, one per `LLMClientSettings`.
+
+    Clients for the same base url share one keep-alive httpx pool, so TLS
+    sessions and connections are reused across requests. Temperature is
+    bound per call and never part of the client identity."""
+
+    def __init__(self) -> None:
+        self._http_clients: dict[str, httpx.AsyncClient] = {}
+        self._chat_clients: dict[LLMClientSettings, ChatOpenAI] = {}
+        self._sdk_clients: dict[LLMClientSettings, AsyncOpenAI] = {}
+
+    def http_client(self, base_url: str) -> httpx.AsyncClient:
+        client = self._http_clients.get(base_url)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=settings.LLM_HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._http_clients[base_url] = client
+        return client
+
+    def chat(self, provider: Provider) -> ChatOpenAI:
+        cfg = client_settings(provider)
+        client = self._chat_clients.get(cfg)
+        if client is None:
+            client = ChatOpenAI(
+                api_key=cfg.api_key,  # type: ignore
+                base_url=cfg.base_url,
+                model=cfg.model,
+                max_tokens=cfg.max_tokens,  # type: ignore
+                max_retries=0,  # retried by the provider scheduler
+                stream_usage=True,
+                http_async_client=self.http_client(cfg.base_url),
+            )
+            self._chat_clients[cfg] = client
+        return client
+
+    def llm(self, provider: Provider, temperature: float) -> Runnable[Any, Any]:
+        return self.chat(provider).bind(temperature=temperature)
+
+    def sdk(self, provider: Provider) -> AsyncOpenAI:
+        cfg = client_settings(provider)
+        client = self._sdk_clients.get(cfg)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=cfg.api_key,
+                base_url=cfg.base_url,
+                max_retries=0,
+                http_client=self.http_client(cfg.base_url),
+            )
+            self._sdk_clients[cfg] = client
+        return client
+
+    async def _warmup_provider(self, provider: Provider) -> None:
+        cfg = client_settings(provider)
+        try:
+            await self.http_client(cfg.base_url).get(
+                f"{cfg.base_url}/models",
+                headers={"Authorization": f"Bearer {cfg.api_key}"},
+                timeout=settings.LLM_WARMUP_TIMEOUT,
+            )
+            logger.info("warmup :: connection to %s is ready", provider.value)
+        except Exception as e:
+            logger.warning("warmup :: %s failed: %s", provider.value, fmt_err(e))
+
+    async def warmup(self) -> None:
+        """Opens the keep-alive connections before the first request."""
+        providers = [
+            provider
+            for provider in (Provider.openai, Provider.deepseek)
+            if client_settings(provider).api_key
+        ]
+        await asyncio.gather(*(self._warmup_provider(p) for p in providers))
+
+    async def aclose(self) -> None:
+        clients = list(self._http_clients.values())
+        self._http_clients.clear()
+        self._chat_clients.clear()
+        self._sdk_clients.clear()
+        await asyncio.gather(*(c.aclose() for c in clients), return_exceptions=True)
+
+
+registry: Final = LLMClientRegistry()
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Final
+
+from redis.asyncio import Redis
+
+from src.app_api.models.request_models.request_info import LLMJobRequestMdl
+from src.app_api.models.response_models.response_info import JobApiMdl, JobStatus
+from src.dto.redis_models import RedisNamespace
+from src.env import settings
+from src.errors import fmt_err
+from src.service_llm import llm_manager
+from src.service_llm.provider_router import Routing
+
+logger: Final = logging.getLogger(__name__)
+
+_TERMINAL: Final = frozenset({JobStatus.DONE, JobStatus.FAILED})
+# errors a retry cannot fix: the prompt itself is missing or broken
+_PERMANENT_ERRORS: Final = ("prompt does not exist", "prompt_template is")
+
+
+class _JobRecord(JobApiMdl):
+    request: LLMJobRequestMdl
+
+
+def _job_key(job_id: str) -> str:
+    return f"{RedisNamespace.LLM_JOB.value}:{job_id}"
+
+
+async def _load(job_id: str, rds: Redis) -> _JobRecord | None:
+    raw = await rds.get(_job_key(job_id))
+    return _JobRecord.model_validate_json(raw) if raw is not None else None
+
+
+async def _save(record: _JobRecord, rds: Redis) -> None:
+    record.updated_at = datetime.now()
+    await rds.set(
+        _job_key(record.job_id), record.model_dump_json(), ex=settings.JOB_TTL_S
+    )
+
+
+def _public(record: _JobRecord) -> JobApiMdl:
+    return JobApiMdl.model_validate(record.model_dump(exclude={"request"}))
+
+
+async def submit_job(
+    request: LLMJobRequestMdl,
+    rds: Redis,
+    enqueue: Callable[[str], Awaitable[None]],
+) -> JobApiMdl:
+    """Stores the job, then hands its id to the worker queue.
+
+    The record is written first so a worker never picks up an unknown id;
+    if the broker is unreachable the job is returned as failed."""
+    now = datetime.now()
+    record = _JobRecord(
+        job_id=uuid.uuid4().hex,
+        status=JobStatus.QUEUED,
+        created_at=now,
+        updated_at=now,
+        request=request,
+    )
+    await _save(record, rds)
+    try:
+        await enqueue(record.job_id)
+    except Exception as e:
+        logger.exception(e)
+        record.status = JobStatus.FAILED
+        record.error = f"could not enqueue the job: {fmt_err(e)}"
+        await _save(record, rds)
+    return _public(record)
+
+
+async def run_job(job_id: str, attempt: int, rds: Redis) -> bool:
+    """Runs one delivery of a job; returns whether it should be retried.
+
+    Deliveries are at-least-once: a job that is already finished is left
+    as it is. Failed generations are never cached, so a retry asks the
+    provider again instead of replaying the failure."""
+    record = await _load(job_id, rds)
+    if record is None or record.status in _TERMINAL:
+        return False
+    record.status = JobStatus.RUNNING
+    record.attempts = attempt
+    await _save(record, rds)
+
+    request = record.request
+    log_extra = {"req_id": job_id}
+    try:
+        result = await llm_manager.create_query(
+            request.prompt_id,
+            request.params,
+            request.provider,
+            request.cache_key,
+            request.lang_abbr,
+            rds,
+            log_extra=log_extra,
+            auto_cache=request.auto_cache,
+            chunked=request.chunked,
+            translation_memory=request.translation_memory,
+            routing=Routing(
+                fallbacks=tuple(request.fallback_providers), hedge=request.hedge
+            ),
+        )
+        error = result.error if not result.translations else ""
+    except Exception as e:
+        logger.exception(e, extra=log_extra)
+        result, error = None, fmt_err(e)
+
+    retry = (
+        len(error) > 0
+        and not error.startswith(_PERMANENT_ERRORS)
+        and attempt < settings.JOB_MAX_ATTEMPTS
+    )
+    record.result = result
+    record.error = error
+    if retry:
+        record.status = JobStatus.QUEUED
+    else:
+        record.status = JobStatus.FAILED if error else JobStatus.DONE
+    await _save(record, rds)
+    return retry
+
+
+async def get_job(job_id: str, wait_s: float, rds: Redis) -> JobApiMdl | None:
+    """Current state of a job; with `wait_s` > 0 long-polls until it is
+    finished or the wait is over, without holding a Redis connection."""
+    deadline = time.monotonic() + min(wait_s, settings.JOB_MAX_WAIT_S)
+    while True:
+        record = await _load(job_id, rds)
+        if record is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if record.status in _TERMINAL or remaining <= 0:
+            return _public(record)
+        await asyncio.sleep(min(settings.JOB_POLL_S, remaining))
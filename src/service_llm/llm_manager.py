@@ -1,12 +1,15 @@
-import ast
+import asyncio
 import logging
 import re
+from dataclasses import dataclass
 from datetime import datetime
-from typing import AsyncIterator
+from collections.abc import Callable
+from typing import Any, AsyncIterator
 
 from redis.asyncio import Redis
 
 from src.app_api.models.request_models.request_info import (
+    LLMBatchItemApiMdl,
     LLMRequestParametersApiMdl,
     ModifiedPromptParametersApiMdl,
     PromptRequestApiMdl,
@@ -14,18 +17,51 @@ from src.app_api.models.request_models.request_info import (
 from src.app_api.models.response_models.response_info import (
     ResponseLLMApiMdl,
     ResponsePromptApiMdl,
+    StreamChunkApiMdl,
+    UsageApiMdl,
 )
-from src.dto.llm_info import Provider, Prompt
-
-from langchain_community.chat_models import ChatOpenAI
-
-from langchain_community.llms import OpenAI
+from src.common.async_utils import SingleFlight, gather_limited, spawn
+from src.common.timing import span
+from src.dto.llm_info import Provider, PromptTemplate, compile_prompt_template
 
 from src.env import settings
-from src.errors import fmt_err
+from src.errors import PromptTemplateError, fmt_err
+from src.metrics import CACHE_LOOKUPS, PROMPT_ERRORS
+from src.service_llm.circuit_breaker import breaker_for, guarded
+from src.service_llm.llm_cache import (
+    acquire_flight_lock,
+    auto_cache_key,
+    get_cached_response,
+    get_cached_responses,
+    is_auto_cache_key,
+    is_cacheable,
+    release_flight_lock,
+    set_cached_response,
+    set_cached_responses,
+    wait_cached_response,
+)
+from src.service_llm import prompt_store
+from src.service_llm.llm_clients import registry
+from src.service_llm.prompt_cache import prompt_cache, publish_invalidation
+from src.service_llm.provider_router import Routing, call_routed
+from src.service_llm.provider_scheduler import estimate_tokens, scheduler_for
+from src.service_llm.query_lookup import lookup_query
+from src.service_llm.text_chunking import (
+    Segment,
+    join_segments,
+    merge_segments,
+    pack_runs,
+    split_sentences,
+    split_text,
+)
+from src.service_llm.translation_memory import memory_keys, recall, remember
+from src.service_llm.usage import priced_usage, record_usage, sum_usage, usage_of
 
 logger = logging.getLogger(__name__)
 
+# identical requests in flight in this worker share one provider call
+_flights: SingleFlight[ResponseLLMApiMdl] = SingleFlight()
+
 """
 template for prompt version: {id_prompt}v{version_id, for example 1, 2, 3, ... }
 class ResponseLLMApiMdl(BaseModel):
@@ -38,7 +74,10 @@ class ResponseLLMApiMdl(BaseModel):
 
 
 def wrap_excluded_words(text: str, exclude: list[str]) -> str:
-    exclude_sorted = sorted(exclude, key=len, reverse=True)
+    exclude_sorted = sorted(filter(None, exclude), key=len, reverse=True)
+    if not exclude_sorted:
+        # an empty alternation matches at every word boundary
+        return text
     pattern = re.compile(r"\b(" + "|".join(map(re.escape, exclude_sorted)) + r")\b")
 
     def replacer(match: re.Match) -> str:
@@ -52,170 +91,834 @@ def unwrap_kept_words(text: str) -> str:
     return re.sub(r"</?keep>", "", text)
 
 
-async def _deepseek_llm(temperature: float) -> ChatOpenAI:
-    return ChatOpenAI(
-        api_key=settings.DEEPSEEK_API_KEY.get_secret_value(),
-        base_url="https://api.deepseek.com/v1",
-        model="deepseek-chat",
-        temperature=temperature,
-        max_tokens=1024,
-    )
+class KeepTagStripper:
+    """Incremental `unwrap_kept_words` for streamed text.
 
+    A chunk ending in the middle of a `<keep>`/`</keep>` tag is held back
+    until the next chunk shows whether it really is a tag."""
 
-async def _openai_llm(temperature: float) -> OpenAI:
-    return OpenAI(
-        openai_api_key=settings.OPENAI_API_KEY.get_secret_value(),
-        temperature=temperature,
-    )
+    _tags = ("<keep>", "</keep>")
 
+    def __init__(self) -> None:
+        self._pending = ""
 
-"""async def _claude_llm(temperature: float) -> ChatAnthropic:
-    return ChatAnthropic(
-        model_name="claude-3-5-sonnet-20241022",
-        anthropic_api_key=settings.CLAUDE_API_KEY.get_secret_value(),
-    )"""
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        self._pending = ""
+        start = text.rfind("<")
+        if start != -1:
+            tail = text[start:]
+            if any(tag != tail and tag.startswith(tail) for tag in self._tags):
+                text, self._pending = text[:start], tail
+        return unwrap_kept_words(text)
 
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return text
 
-async def create_query(
+
+def _response_text(llm_response: Any) -> str:
+    # chat models answer with a message, completion models with a plain str
+    return str(getattr(llm_response, "content", llm_response))
+
+
+def _count_cache_lookup(cache_key: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(
+        kind="auto" if is_auto_cache_key(cache_key) else "manual",
+        result="hit" if hit else "miss",
+    ).inc()
+
+
+async def _resolve_latest_version(prompt_id: int, rds: Redis) -> int | None:
+    version = prompt_cache.get_latest(prompt_id)
+    if version is None:
+        generation = prompt_cache.generation
+        version = await prompt_store.latest_prompt_version(prompt_id, rds)
+        if version is not None:
+            prompt_cache.put_latest(prompt_id, version, generation)
+    return version
+
+
+@dataclass
+class _QueryPlan:
+    llm_query_params: LLMRequestParametersApiMdl
+    cache_key: str
+    prompt_version: str = ""
+    prompt_template: PromptTemplate | None = None
+    # set when there is nothing to generate: a cache hit or an error
+    response: ResponseLLMApiMdl | None = None
+    cached: bool = False
+
+
+async def _plan_query(
     prompt_id: int,
     llm_query_params: LLMRequestParametersApiMdl,
     provider: Provider,
     cache_key: str,
+    auto_cache: bool,
     lang_abbr: str,
     rds: Redis,
     log_extra: dict[str, str],
-) -> ResponseLLMApiMdl:
+    normalized: bool = False,
+) -> _QueryPlan:
+    """Resolves cache hit, prompt version and template with one Redis call.
+
+    Templates and the latest version come from the worker cache when
+    possible; only an auto cache key for a not yet known latest version
+    needs a second round-trip."""
+    version = llm_query_params.prompt_version_id
+    if version is None:
+        version = prompt_cache.get_latest(prompt_id)
+    if version is not None:
+        llm_query_params = llm_query_params.model_copy(
+            update={"prompt_version_id": version}
+        )
+        if len(cache_key) == 0 and auto_cache:
+            cache_key = auto_cache_key(
+                prompt_id, llm_query_params, provider, lang_abbr, normalized
+            )
+    prompt_template = (
+        prompt_cache.get(f"{prompt_id}v{version}") if version is not None else None
+    )
+    if isinstance(prompt_template, PromptTemplateError):
+        return _QueryPlan(
+            llm_query_params, cache_key, response=_invalid_template(provider)
+        )
+
+    generation = prompt_cache.generation
+    with span("redis_lookup"):
+        lookup = await lookup_query(
+            prompt_id, version, cache_key, prompt_template is None, rds
+        )
     if len(cache_key) > 0:
+        _count_cache_lookup(cache_key, lookup.cached is not None)
+    if lookup.cached is not None:
         logger.debug(
-            f"create_query :: cache_key is not none. prompt_id: {prompt_id} -- {datetime.now()}",
+            "create_query :: cache_key is exist. cache_key: %s",
+            cache_key,
             extra=log_extra,
         )
-        if await rds.exists(cache_key):
-            response = await rds.hgetall(cache_key)  # type: ignore
-            logger.debug(
-                f"create_query :: cache_key is exist. response from db: {type(response)} prompt_id: {prompt_id} -- {datetime.now()}",
-                extra=log_extra,
+        return _QueryPlan(
+            llm_query_params, cache_key, response=lookup.cached, cached=True
+        )
+    if lookup.prompt_missing:
+        PROMPT_ERRORS.labels(reason="missing").inc()
+        logger.warning(
+            "create_query :: prompt with id: %s does not exist",
+            prompt_id,
+            extra=log_extra,
+        )
+        return _QueryPlan(
+            llm_query_params,
+            cache_key,
+            response=ResponseLLMApiMdl(
+                prompt_id=prompt_id,
+                translations=[],
+                error=f"prompt does not exist with id: {prompt_id}",
+                provider=provider,
+                created_at=datetime.now(),
+            ),
+        )
+
+    if version is None:
+        version = lookup.version
+        prompt_cache.put_latest(prompt_id, version, generation)  # type: ignore
+        llm_query_params = llm_query_params.model_copy(
+            update={"prompt_version_id": version}
+        )
+        if len(cache_key) == 0 and auto_cache:
+            cache_key = auto_cache_key(
+                prompt_id, llm_query_params, provider, lang_abbr, normalized
             )
-            return ResponseLLMApiMdl(
-                prompt_id=response[b"prompt_id"].decode("utf-8"),
-                translations=ast.literal_eval(
-                    response[b"translations"].decode("utf-8")
+            with span("redis_cache_get"):
+                cached = await get_cached_response(cache_key, rds, log_extra)
+            _count_cache_lookup(cache_key, cached is not None)
+            if cached is not None:
+                return _QueryPlan(
+                    llm_query_params, cache_key, response=cached, cached=True
+                )
+
+    prompt_version = f"{prompt_id}v{version}"
+    if prompt_template is None:
+        if lookup.template is None:
+            PROMPT_ERRORS.labels(reason="template_missing").inc()
+            return _QueryPlan(
+                llm_query_params,
+                cache_key,
+                response=ResponseLLMApiMdl(
+                    prompt_id=0,
+                    translations=[],
+                    error="prompt_template is None",
+                    provider=provider,
+                    created_at=datetime.now(),
                 ),
-                error=response[b"error"].decode("utf-8"),
-                provider=response[b"provider"].decode("utf-8"),
-                created_at=response[b"created_at"].decode("utf-8"),
             )
+        prompt_template = _compile_stored(prompt_id, prompt_version, lookup.template)
+        if prompt_template is None:
+            return _QueryPlan(
+                llm_query_params, cache_key, response=_invalid_template(provider)
+            )
+    return _QueryPlan(llm_query_params, cache_key, prompt_version, prompt_template)
 
-    if not await rds.exists(str(prompt_id)):
-        response = ResponseLLMApiMdl(
-            prompt_id=prompt_id,
-            translations=[],
-            error=f"prompt does not exist with id: {prompt_id}",
-            provider=provider,
-            created_at=datetime.now(),
+
+def _compile_stored(
+    prompt_id: int, prompt_version: str, template: str
+) -> PromptTemplate | None:
+    """Compiles a template read from Redis into the worker cache. Templates
+    are validated when written; one stored before that may lack `{text}`,
+    but fails on an unparseable placeholder. The failure is cached too, so
+    it is counted once per version."""
+    try:
+        compiled = compile_prompt_template(template, require_text=False)
+    except PromptTemplateError as e:
+        PROMPT_ERRORS.labels(reason="invalid").inc()
+        prompt_cache.put(prompt_id, prompt_version, e)
+        return None
+    prompt_cache.put(prompt_id, prompt_version, compiled)
+    return compiled
+
+
+def _invalid_template(provider: Provider) -> ResponseLLMApiMdl:
+    return ResponseLLMApiMdl(
+        prompt_id=0,
+        translations=[],
+        error="prompt_template is invalid",
+        provider=provider,
+        created_at=datetime.now(),
+    )
+
+
+@dataclass(frozen=True)
+class _SegmentPrompt:
+    segment: Segment  # source text, with `<keep>` tags, and its separator
+    prompt: str
+
+
+def _render_prompt(
+    prompt_id: int,
+    prompt_template: PromptTemplate,
+    llm_query_params: LLMRequestParametersApiMdl,
+    lang_abbr: str,
+    log_extra: dict[str, str],
+    max_segment_tokens: int = 0,
+    by_sentence: bool = False,
+) -> list[_SegmentPrompt]:
+    """One prompt per segment of the text (see `split_text`), one in total
+    unless `max_segment_tokens` is set; one per sentence with `by_sentence`."""
+    with span("exclude_wrap"):
+        text = wrap_excluded_words(
+            llm_query_params.text, llm_query_params.exclude.exceptions_list
+        )
+        segments = (
+            split_sentences(text)
+            if by_sentence
+            else split_text(text, max_segment_tokens)
         )
-        logger.warn(
-            f"create_query :: prompt with id: {prompt_id} does not exist -- {datetime.now()}",
+    with span("render"):
+        prompts = [
+            _SegmentPrompt(
+                segment,
+                prompt_template.render(
+                    segment.text,
+                    llm_query_params.context,
+                    llm_query_params.exclude.exception,
+                    lang_abbr,
+                ),
+            )
+            for segment in segments
+        ]
+    logger.debug(
+        "create_query :: prompt was initialization. prompt_id: %s segments: %s",
+        prompt_id,
+        len(prompts),
+        extra=log_extra,
+    )
+    return prompts
+
+
+@dataclass(frozen=True)
+class _Memory:
+    keys: list[list[str]]  # per variant, a translation memory key per segment
+    render: Callable[[str], str]  # the prompt for a run of segments
+
+
+async def _generate(
+    prompt_id: int,
+    prompts: list[_SegmentPrompt],
+    provider: Provider,
+    llm_query_params: LLMRequestParametersApiMdl,
+    rds: Redis,
+    log_extra: dict[str, str],
+    routing: Routing = Routing(),
+    memory: _Memory | None = None,
+) -> ResponseLLMApiMdl:
+    """Every variant translates all `prompts` (the segments of one text)
+    concurrently and joins them back in order; a failed segment fails its
+    variant.
+
+    With `memory`, a variant takes the segments it knows from its memory and
+    sends each run of neighbouring unknown ones as one prompt, packed up to
+    `LLM_SEGMENT_MAX_TOKENS`. A run whose translation splits into as many
+    sentences as it has segments is added to the memory sentence by
+    sentence; otherwise it is only used as a whole."""
+    segments = [prompt.segment for prompt in prompts]
+    known: list[list[str | None]] = [
+        [None] * len(prompts) for _ in range(llm_query_params.variants)
+    ]
+    lookups = hits = 0
+    if memory:
+        with span("memory_lookup"):
+            recalled = await recall([key for keys in memory.keys for key in keys], rds)
+        known = [
+            recalled[i * len(prompts) : (i + 1) * len(prompts)]
+            for i in range(llm_query_params.variants)
+        ]
+        lookups = len(recalled)
+        hits = sum(translation is not None for translation in recalled)
+        CACHE_LOOKUPS.labels(kind="memory", result="hit").inc(hits)
+        CACHE_LOOKUPS.labels(kind="memory", result="miss").inc(lookups - hits)
+
+    async def _segment(prompt: str) -> tuple[str, Provider, UsageApiMdl]:
+        # a translation is about as long as its input
+        tokens = 2 * estimate_tokens(prompt)
+
+        async def _call(target: Provider) -> Any:
+            llm = registry.llm(target, llm_query_params.temperature)
+            return await guarded(
+                breaker_for(target),
+                lambda: scheduler_for(target).call(
+                    lambda: llm.ainvoke(prompt), tokens, rds
+                ),
+            )
+
+        llm_response, served_by = await call_routed(provider, routing, _call)
+        return (
+            unwrap_kept_words(_response_text(llm_response)),
+            served_by,
+            usage_of(llm_response, served_by),
+        )
+
+    def _runs(i: int) -> list[tuple[list[int], str]]:
+        missing = [j for j, translation in enumerate(known[i]) if translation is None]
+        if memory is None:
+            return [([j], prompts[j].prompt) for j in missing]
+        return [
+            (run, prompts[run[0]].prompt)
+            if len(run) == 1
+            else (run, memory.render(merge_segments([segments[j] for j in run]).text))
+            for run in pack_runs(segments, missing, settings.LLM_SEGMENT_MAX_TOKENS)
+        ]
+
+    created_at = datetime.now()
+
+    async def _variant(
+        i: int,
+    ) -> tuple[str, list[tuple[Provider, UsageApiMdl]], list[tuple[str, str]]]:
+        """The joined translation, who served each prompt at what usage, and
+        the `(key, translation)` pairs it adds to the memory."""
+        runs = _runs(i)
+        with span(f"llm_v{i}"):
+            if len(runs) == 1:
+                generated = [await _segment(runs[0][1])]
+            else:
+                generated = await gather_limited(  # type: ignore
+                    [_segment(prompt) for _, prompt in runs],
+                    settings.LLM_SEGMENT_CONCURRENCY,
+                )
+                for result in generated:
+                    if isinstance(result, BaseException):
+                        raise result
+        logger.debug(
+            "create_query :: LLM sent response for variant: %s. prompt_id: %s prompts: %s segments: %s",
+            i,
+            prompt_id,
+            len(runs),
+            len(prompts),
             extra=log_extra,
         )
-        return response
+        translated = {
+            run[0]: (run, translation)
+            for (run, _), (translation, _, _) in zip(runs, generated)  # type: ignore
+        }
+        texts: list[str] = []
+        parts: list[Segment] = []
+        learned: list[tuple[str, str]] = []
+        j = 0
+        while j < len(segments):
+            if j not in translated:
+                texts.append(known[i][j])  # type: ignore
+                parts.append(segments[j])
+                j += 1
+                continue
+            run, translation = translated[j]
+            sentences = (
+                split_sentences(translation) if len(run) > 1 else [Segment(translation)]
+            )
+            if len(sentences) == len(run):
+                for k, sentence in zip(run, sentences):
+                    texts.append(sentence.text)
+                    parts.append(segments[k])
+                    if memory:
+                        learned.append((memory.keys[i][k], sentence.text.strip()))
+            else:
+                texts.append(translation)
+                parts.append(merge_segments([segments[k] for k in run]))
+            j = run[-1] + 1
+        joined = join_segments(texts, parts)
+        return (
+            joined,
+            [(served_by, usage) for _, served_by, usage in generated],  # type: ignore
+            learned,
+        )
 
-    prompt_version = f"{prompt_id}v{llm_query_params.prompt_version_id}"
-    prompt_template = await rds.hget(f"{prompt_id}", prompt_version)  # type: ignore
-    if prompt_template is None:
-        return ResponseLLMApiMdl(
-            prompt_id=0,
-            translations=[],
-            error="prompt_template is None",
-            provider=provider,
-            created_at=datetime.now(),
+    results = await gather_limited(
+        [_variant(i) for i in range(0, llm_query_params.variants)],
+        settings.LLM_VARIANTS_CONCURRENCY,
+    )
+    served = [r for r in results if isinstance(r, tuple)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    error: str = fmt_err(errors[0]) if errors else ""  # type: ignore
+    spawn(
+        record_usage(
+            f"{prompt_id}v{llm_query_params.prompt_version_id}",
+            [calls for _, calls, _ in served],
+            rds,
         )
+    )
+    learned = [item for _, _, items in served for item in items]
+    if learned:
+        spawn(remember(learned, rds))
+
+    return ResponseLLMApiMdl(
+        prompt_id=prompt_id,
+        translations=[translation for translation, _, _ in served],
+        error=error,
+        provider=provider,
+        created_at=created_at,
+        # the provider of the first prompt when a fallback served only some
+        served_by=[calls[0][0] if calls else provider for _, calls, _ in served],
+        usage=[sum_usage([usage for _, usage in calls]) for _, calls, _ in served],
+        memory_hit_ratio=hits / lookups if memory else None,
+    )
+
+
+async def create_query(
+    prompt_id: int,
+    llm_query_params: LLMRequestParametersApiMdl,
+    provider: Provider,
+    cache_key: str,
+    lang_abbr: str,
+    rds: Redis,
+    log_extra: dict[str, str],
+    auto_cache: bool = False,
+    routing: Routing = Routing(),
+    normalized: bool = False,
+    chunked: bool = False,
+    translation_memory: bool = False,
+) -> ResponseLLMApiMdl:
+    """With `normalized`, a text translated before that differs only in
+    whitespace or Unicode form (same prompt version, language and
+    parameters) reuses that translation: the auto cache key is then always
+    used, computed over the normalized text.
+
+    With `chunked`, a text longer than `LLM_SEGMENT_MAX_TOKENS` is split
+    into segments that are translated concurrently, each with the shared
+    `context`.
+
+    With `translation_memory`, every sentence is looked up in the
+    translation memory first; runs of unknown neighbouring sentences go to
+    the provider together and the translations are joined back with the
+    text's paragraph breaks."""
+    plan = await _plan_query(
+        prompt_id,
+        llm_query_params,
+        provider,
+        cache_key,
+        auto_cache or normalized,
+        lang_abbr,
+        rds,
+        log_extra,
+        normalized=normalized,
+    )
+    if plan.response is not None:
+        return plan.response
+
+    flight_key = plan.cache_key or auto_cache_key(
+        prompt_id, plan.llm_query_params, provider, lang_abbr
+    )
     try:
-        prompt = Prompt(
-            prompt_id=prompt_id, version=prompt_version, prompt_template=prompt_template
-        ).get_prompt(
-            wrap_excluded_words(
-                llm_query_params.text, llm_query_params.exclude.exceptions_list
+        response = await _flights.do(
+            flight_key,
+            lambda: _render_and_generate(
+                prompt_id,
+                plan,
+                provider,
+                lang_abbr,
+                rds,
+                log_extra,
+                routing,
+                settings.LLM_SEGMENT_MAX_TOKENS if chunked else 0,
+                translation_memory,
             ),
-            llm_query_params.context,
-            llm_query_params.exclude.exception,
-            lang_abbr,
+            timeout=settings.SINGLE_FLIGHT_TIMEOUT_S,
         )
-    except Exception:
+        return response
+    except asyncio.TimeoutError:
         return ResponseLLMApiMdl(
-            prompt_id=0,
+            prompt_id=prompt_id,
             translations=[],
-            error="prompt_template is invalid",
+            error="timed out waiting for an identical in-flight request",
             provider=provider,
             created_at=datetime.now(),
         )
-    logger.debug(
-        f"create_query :: prompt was initialization. prompt: {type(prompt)} prompt_id: {prompt_id} -- {datetime.now()}",
-        extra=log_extra,
-    )
 
-    match provider:
-        case Provider.deepseek:
-            llm = await _deepseek_llm(llm_query_params.temperature)
-        # case Provider.claude:
-        # llm = await _claude_llm(llm_query_params.temperature)  # type: ignore
-        case _:
-            llm = await _openai_llm(llm_query_params.temperature)
 
-    logger.debug(
-        f"create_query :: LLM was initialization. LLM: {type(llm)} prompt_id: {prompt_id} -- {datetime.now()}",
-        extra=log_extra,
+async def _render_and_generate(
+    prompt_id: int,
+    plan: _QueryPlan,
+    provider: Provider,
+    lang_abbr: str,
+    rds: Redis,
+    log_extra: dict[str, str],
+    routing: Routing,
+    max_segment_tokens: int = 0,
+    translation_memory: bool = False,
+) -> ResponseLLMApiMdl:
+    prompts = _render_prompt(
+        prompt_id,
+        plan.prompt_template,  # type: ignore
+        plan.llm_query_params,
+        lang_abbr,
+        log_extra,
+        max_segment_tokens,
+        by_sentence=translation_memory,
     )
+    memory = None
+    if translation_memory:
+        params = plan.llm_query_params
+        memory = _Memory(
+            keys=[
+                memory_keys(
+                    plan.prompt_version,
+                    lang_abbr,
+                    provider,
+                    [prompt.segment.text for prompt in prompts],
+                    variant=i,
+                )
+                for i in range(params.variants)
+            ],
+            render=lambda text: plan.prompt_template.render(  # type: ignore
+                text, params.context, params.exclude.exception, lang_abbr
+            ),
+        )
 
-    translations: list[str] = []
-    error: str = ""
-    created_at = datetime.now()
-
-    try:
-        for i in range(0, llm_query_params.variants):
-            llm_response = llm.invoke(prompt)
-            translations.append(unwrap_kept_words(str(llm_response.content)))
+    cache_key = plan.cache_key
+    lock_token = None
+    if len(cache_key) > 0 and settings.SINGLE_FLIGHT_REDIS_LOCK:
+        lock_token = await acquire_flight_lock(cache_key, rds)
+        if lock_token is None:
             logger.debug(
-                f"create_query :: LLM sent response for variant: {i} and translit text. prompt_id: {prompt_id} -- {datetime.now()}",
+                "create_query :: waiting for another worker. cache_key: %s",
+                cache_key,
                 extra=log_extra,
             )
-    except Exception as e:
-        error = fmt_err(e)
+            cached = await wait_cached_response(cache_key, rds, log_extra)
+            if cached is not None:
+                return cached
+    try:
+        response = await _generate(
+            prompt_id,
+            prompts,
+            provider,
+            plan.llm_query_params,
+            rds,
+            log_extra,
+            routing,
+            memory,
+        )
+        if len(cache_key) > 0 and is_cacheable(response):
+            with span("cache_write"):
+                await set_cached_response(cache_key, response, rds)
+    finally:
+        if lock_token is not None:
+            await release_flight_lock(cache_key, lock_token, rds)
+    return response
+
+
+async def create_query_stream(
+    prompt_id: int,
+    llm_query_params: LLMRequestParametersApiMdl,
+    provider: Provider,
+    cache_key: str,
+    lang_abbr: str,
+    rds: Redis,
+    log_extra: dict[str, str],
+    auto_cache: bool = False,
+) -> AsyncIterator[StreamChunkApiMdl]:
+    """Streaming flavour of `create_query`.
+
+    Yields token deltas tagged with their variant as the provider sends
+    them, a `done` chunk per variant and one final chunk with the full
+    result. The cache write runs in the background after the last token."""
+    plan = await _plan_query(
+        prompt_id,
+        llm_query_params,
+        provider,
+        cache_key,
+        auto_cache,
+        lang_abbr,
+        rds,
+        log_extra,
+    )
+    if plan.cached and plan.response is not None:
+        for i, translation in enumerate(plan.response.translations):
+            yield StreamChunkApiMdl(variant=i, delta=translation)
+            yield StreamChunkApiMdl(variant=i, done=True)
+        yield StreamChunkApiMdl(result=plan.response)
+        return
+
+    if plan.response is not None:
+        yield StreamChunkApiMdl(error=plan.response.error, result=plan.response)
+        return
+    prompt = _render_prompt(
+        prompt_id,
+        plan.prompt_template,  # type: ignore
+        plan.llm_query_params,
+        lang_abbr,
+        log_extra,
+    )[0].prompt
+    llm_query_params, cache_key = plan.llm_query_params, plan.cache_key
+
+    llm = registry.llm(provider, llm_query_params.temperature)
+    created_at = datetime.now()
+    variants = llm_query_params.variants
+    texts: list[str | None] = [None] * variants
+    usages: list[UsageApiMdl | None] = [None] * variants
+    errors: list[str] = []
+    queue: asyncio.Queue[StreamChunkApiMdl] = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max(1, settings.LLM_VARIANTS_CONCURRENCY))
+    scheduler = scheduler_for(provider)
+    breaker = breaker_for(provider)
+    tokens = 2 * estimate_tokens(prompt)
+
+    async def _variant(i: int) -> None:
+        stripper = KeepTagStripper()
+        parts: list[str] = []
+        prompt_tokens, completion_tokens = 0, 0
+        try:
+            # no retries here: tokens already sent cannot be taken back
+            async with semaphore, scheduler.slot(tokens, rds), breaker:
+                async for chunk in llm.astream(prompt):
+                    if chunk.usage_metadata:
+                        prompt_tokens += chunk.usage_metadata["input_tokens"]
+                        completion_tokens += chunk.usage_metadata["output_tokens"]
+                    delta = stripper.feed(_response_text(chunk))
+                    if delta:
+                        parts.append(delta)
+                        await queue.put(StreamChunkApiMdl(variant=i, delta=delta))
+            delta = stripper.flush()
+            if delta:
+                parts.append(delta)
+                await queue.put(StreamChunkApiMdl(variant=i, delta=delta))
+            texts[i] = "".join(parts)
+            usages[i] = priced_usage(provider, prompt_tokens, completion_tokens)
+            await queue.put(StreamChunkApiMdl(variant=i, done=True))
+        except Exception as e:
+            # keep the slot so translations[i] still answers variant i
+            texts[i] = ""
+            usages[i] = priced_usage(provider, prompt_tokens, completion_tokens)
+            errors.append(fmt_err(e))
+            await queue.put(StreamChunkApiMdl(variant=i, done=True, error=errors[-1]))
+
+    tasks = [asyncio.create_task(_variant(i)) for i in range(0, variants)]
+    try:
+        finished = 0
+        while finished < variants:
+            chunk = await queue.get()
+            finished += int(chunk.done)
+            yield chunk
+    finally:
+        for task in tasks:
+            task.cancel()
 
     response = ResponseLLMApiMdl(
         prompt_id=prompt_id,
-        translations=translations,
-        error=error,
+        translations=[text for text in texts if text is not None],
+        error=errors[0] if errors else "",
         provider=provider,
         created_at=created_at,
+        usage=[usage for usage in usages if usage is not None],
     )
+    spawn(
+        record_usage(
+            f"{prompt_id}v{llm_query_params.prompt_version_id}",
+            [[(provider, usage)] for usage in response.usage],
+            rds,
+        )
+    )
+    # a failed variant leaves an empty translation that must not be served
+    if len(cache_key) > 0 and not errors and is_cacheable(response):
+        spawn(set_cached_response(cache_key, response, rds))
+    yield StreamChunkApiMdl(result=response)
 
-    if len(cache_key) > 0:
-        await rds.hset(  # type: ignore
-            cache_key,
-            mapping={
-                "prompt_id": response.prompt_id,
-                "translations": str(response.translations),
-                "error": response.error,
-                "provider": response.provider.value,
-                "created_at": str(response.created_at),
-            },
+
+async def create_query_batch(
+    prompt_id: int,
+    items: list[LLMBatchItemApiMdl],
+    provider: Provider,
+    lang_abbr: str,
+    rds: Redis,
+    log_extra: dict[str, str],
+    auto_cache: bool = False,
+    routing: Routing = Routing(),
+) -> list[ResponseLLMApiMdl]:
+    """`create_query` for many texts sharing one prompt and language.
+
+    Cache hits and prompt templates are fetched in one pipelined round-trip
+    each; misses go to the provider at most `LLM_BATCH_CONCURRENCY` at a
+    time. Responses keep the input order and carry their own `error`."""
+    if any(item.prompt_version_id is None for item in items):
+        with span("redis_latest"):
+            latest = await _resolve_latest_version(prompt_id, rds)
+        if latest is not None:
+            items = [
+                item
+                if item.prompt_version_id is not None
+                else item.model_copy(update={"prompt_version_id": latest})
+                for item in items
+            ]
+    responses: list[ResponseLLMApiMdl | None] = [None] * len(items)
+    cache_keys = [
+        item.cache_key
+        or (auto_cache_key(prompt_id, item, provider, lang_abbr) if auto_cache else "")
+        for item in items
+    ]
+
+    cached_idx = [i for i, cache_key in enumerate(cache_keys) if len(cache_key) > 0]
+    if cached_idx:
+        with span("redis_cache_get"):
+            cached = await get_cached_responses(
+                [cache_keys[i] for i in cached_idx], rds
+            )
+        for i, response in zip(cached_idx, cached):
+            _count_cache_lookup(cache_keys[i], response is not None)
+            responses[i] = response
+
+    missed_idx = [i for i, response in enumerate(responses) if response is None]
+    logger.debug(
+        "create_query_batch :: %s/%s cache hits. prompt_id: %s",
+        len(items) - len(missed_idx),
+        len(items),
+        prompt_id,
+        extra=log_extra,
+    )
+    if not missed_idx:
+        return responses  # type: ignore
+
+    versions = {f"{prompt_id}v{items[i].prompt_version_id}" for i in missed_idx}
+    templates: dict[str, PromptTemplate | None] = {}
+    invalid: set[str] = set()
+    for prompt_version in versions:
+        cached_template = prompt_cache.get(prompt_version)
+        if isinstance(cached_template, PromptTemplateError):
+            invalid.add(prompt_version)
+        else:
+            templates[prompt_version] = cached_template
+    prompt_exists = True
+    uncached = sorted(v for v, template in templates.items() if template is None)
+    if uncached:
+        with span("redis_templates"):
+            async with rds.pipeline(transaction=False) as pipe:
+                pipe.exists(str(prompt_id))
+                pipe.hmget(str(prompt_id), uncached)
+                prompt_exists, version_templates = await pipe.execute()
+        for prompt_version, template in zip(uncached, version_templates):
+            if template is not None:
+                templates[prompt_version] = _compile_stored(
+                    prompt_id, prompt_version, template.decode("utf-8")
+                )
+                if templates[prompt_version] is None:
+                    invalid.add(prompt_version)
+
+    async def _item(i: int) -> tuple[ResponseLLMApiMdl, bool]:
+        """Returns the response and whether it came from the provider."""
+        item = items[i]
+        if not prompt_exists:
+            PROMPT_ERRORS.labels(reason="missing").inc()
+            return ResponseLLMApiMdl(
+                prompt_id=prompt_id,
+                translations=[],
+                error=f"prompt does not exist with id: {prompt_id}",
+                provider=provider,
+                created_at=datetime.now(),
+            ), False
+        prompt_version = f"{prompt_id}v{item.prompt_version_id}"
+        if prompt_version in invalid:
+            return _invalid_template(provider), False
+        prompt_template = templates[prompt_version]
+        if prompt_template is None:
+            PROMPT_ERRORS.labels(reason="template_missing").inc()
+            return ResponseLLMApiMdl(
+                prompt_id=0,
+                translations=[],
+                error="prompt_template is None",
+                provider=provider,
+                created_at=datetime.now(),
+            ), False
+        prompts = _render_prompt(prompt_id, prompt_template, item, lang_abbr, log_extra)
+        flight_key = cache_keys[i] or auto_cache_key(
+            prompt_id, item, provider, lang_abbr
         )
-    return response
+        return await _flights.do(
+            flight_key,
+            lambda: _generate(
+                prompt_id, prompts, provider, item, rds, log_extra, routing
+            ),
+            timeout=settings.SINGLE_FLIGHT_TIMEOUT_S,
+        ), True
+
+    results = await gather_limited(
+        [_item(i) for i in missed_idx], settings.LLM_BATCH_CONCURRENCY
+    )
+    to_cache: list[tuple[str, ResponseLLMApiMdl]] = []
+    for i, result in zip(missed_idx, results):
+        if isinstance(result, BaseException):
+            responses[i] = ResponseLLMApiMdl(
+                prompt_id=prompt_id,
+                translations=[],
+                error=fmt_err(result),  # type: ignore
+                provider=provider,
+                created_at=datetime.now(),
+            )
+            continue
+        response, generated = result
+        if generated and len(cache_keys[i]) > 0 and is_cacheable(response):
+            to_cache.append((cache_keys[i], response))
+        responses[i] = response
+
+    if to_cache:
+        with span("cache_write"):
+            await set_cached_responses(to_cache, rds)
+    return responses  # type: ignore
 
 
 async def create_prompt(
     prompt_parameters: PromptRequestApiMdl, rds: Redis, *, log_extra: dict[str, str]
 ) -> None:
-    if await rds.exists(str(prompt_parameters.prompt_id)):
+    """Raises `PromptTemplateError` for a template that cannot be rendered."""
+    compile_prompt_template(prompt_parameters.prompt_template)
+    with span("redis_write"):
+        created = await prompt_store.create_prompt(
+            prompt_parameters.prompt_id, prompt_parameters.prompt_template, rds
+        )
+    if not created:
         return
-    prompt_version = f"{prompt_parameters.prompt_id}v0"
-    await rds.hset(  # type: ignore
-        str(prompt_parameters.prompt_id),
-        mapping={prompt_version: prompt_parameters.prompt_template},
-    )
+    with span("invalidate"):
+        await publish_invalidation(prompt_parameters.prompt_id, rds)
     logger.debug(
-        f"create_prompt :: success created prompt id: {prompt_parameters.prompt_id} version: {prompt_version} -- {datetime.now()}",
+        "create_prompt :: success created prompt id: %s version: %sv0",
+        prompt_parameters.prompt_id,
+        prompt_parameters.prompt_id,
         extra=log_extra,
     )
 
@@ -223,8 +926,9 @@ async def create_prompt(
 async def get_prompt(
     prompt_id: int, rds: Redis, *, log_extra: dict[str, str]
 ) -> AsyncIterator[ResponsePromptApiMdl]:
-    async for key, value in rds.hscan_iter(f"{prompt_id}"):
-        yield ResponsePromptApiMdl(prompt_version=key, prompt_template=value)
+    with span("redis_scan"):
+        async for key, value in rds.hscan_iter(f"{prompt_id}"):
+            yield ResponsePromptApiMdl(prompt_version=key, prompt_template=value)
 
 
 async def modify_prompt(
@@ -233,21 +937,18 @@ async def modify_prompt(
     *,
     log_extra: dict[str, str],
 ) -> None:
-    prompt_version = f"{modify_parameters.prompt_id}v-1"
-    async for key in rds.hscan_iter(f"{modify_parameters.prompt_id}", no_values=True):
-        prompt_id_k, version_id_k = key.decode("utf-8").split("v")
-        prompt_id, version_id = prompt_version.split("v")
-        prompt_version = (
-            key.decode("utf-8") if version_id_k > version_id else prompt_version
+    """Raises `PromptTemplateError` for a template that cannot be rendered."""
+    compile_prompt_template(modify_parameters.prompt_template)
+    with span("redis_write"):
+        version = await prompt_store.add_prompt_version(
+            modify_parameters.prompt_id, modify_parameters.prompt_template, rds
         )
-    prompt_id, version_id = prompt_version.split("v")
-
-    prompt_version = f"{prompt_id}v{int(version_id) + 1}"
-    await rds.hset(  # type: ignore
-        f"{modify_parameters.prompt_id}",
-        mapping={prompt_version: modify_parameters.prompt_template},
-    )
+    with span("invalidate"):
+        await publish_invalidation(modify_parameters.prompt_id, rds)
     logger.debug(
-        f"create_prompt :: success created prompt_id: {modify_parameters.prompt_id} version: {prompt_version} -- {datetime.now()}",
+        "create_prompt :: success created prompt_id: %s version: %sv%s",
+        modify_parameters.prompt_id,
+        modify_parameters.prompt_id,
+        version,
         extra=log_extra,
     )
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Final
+
+from redis.asyncio import Redis
+
+from src.dto.llm_info import PromptTemplate
+from src.dto.redis_models import RedisChannels
+from src.env import settings
+from src.errors import PromptTemplateError, fmt_err
+
+logger: Final = logging.getLogger(__name__)
+
+# must stay below REDIS_SOCKET_TIMEOUT
+_LISTEN_POLL_S: Final = 1.0
+
+
+class PromptTemplateCache:
+    """Bounded LRU of compiled prompt templates keyed by `{prompt_id}v{version}`;
+    a stored template that does not compile is kept as its error.
+
+    Entries expire after `ttl_s` as a safety net; the normal way out is
+    `invalidate`, triggered on every worker through Redis pub/sub.
+
+    Every invalidation bumps `generation`: a latest version read from Redis
+    is only stored if no invalidation happened since the read started, so
+    a slow read cannot put back a version that was just replaced."""
+
+    def __init__(self, max_size: int, ttl_s: float) -> None:
+        self._max_size = max_size
+        self._ttl_s = ttl_s
+        self._templates: OrderedDict[
+            str, tuple[float, int, PromptTemplate | PromptTemplateError]
+        ] = OrderedDict()
+        self._versions: dict[int, set[str]] = {}
+        self._latest: dict[int, tuple[float, int]] = {}
+        self.generation = 0
+
+    def get(self, prompt_version: str) -> PromptTemplate | PromptTemplateError | None:
+        entry = self._templates.get(prompt_version)
+        if entry is None:
+            return None
+        expires_at, prompt_id, template = entry
+        if expires_at < time.monotonic():
+            self._drop(prompt_version, prompt_id)
+            return None
+        self._templates.move_to_end(prompt_version)
+        return template
+
+    def put(
+        self,
+        prompt_id: int,
+        prompt_version: str,
+        template: PromptTemplate | PromptTemplateError,
+    ) -> None:
+        if self._max_size <= 0:
+            return
+        self._templates[prompt_version] = (
+            time.monotonic() + self._ttl_s,
+            prompt_id,
+            template,
+        )
+        self._templates.move_to_end(prompt_version)
+        self._versions.setdefault(prompt_id, set()).add(prompt_version)
+        while len(self._templates) > self._max_size:
+            oldest, (_, oldest_prompt_id, _) = next(iter(self._templates.items()))
+            self._drop(oldest, oldest_prompt_id)
+
+    def get_latest(self, prompt_id: int) -> int | None:
+        entry = self._latest.get(prompt_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def put_latest(self, prompt_id: int, version: int, generation: int) -> None:
+        """`generation` is the value read before fetching `version`."""
+        if self._max_size <= 0 or generation != self.generation:
+            return
+        if len(self._latest) >= self._max_size and prompt_id not in self._latest:
+            self._latest.pop(next(iter(self._latest)))
+        self._latest[prompt_id] = (time.monotonic() + self._ttl_s, version)
+
+    def invalidate(self, prompt_id: int) -> None:
+        self.generation += 1
+        self._latest.pop(prompt_id, None)
+        for prompt_version in self._versions.pop(prompt_id, set()):
+            self._templates.pop(prompt_version, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._latest.clear()
+        self._templates.clear()
+        self._versions.clear()
+
+    def _drop(self, prompt_version: str, prompt_id: int) -> None:
+        self._templates.pop(prompt_version, None)
+        versions = self._versions.get(prompt_id)
+        if versions is not None:
+            versions.discard(prompt_version)
+            if not versions:
+                del self._versions[prompt_id]
+
+
+prompt_cache: Final = PromptTemplateCache(
+    max_size=settings.PROMPT_CACHE_MAX_SIZE, ttl_s=settings.PROMPT_CACHE_TTL_S
+)
+
+
+async def publish_invalidation(prompt_id: int, rds: Redis) -> None:
+    prompt_cache.invalidate(prompt_id)
+    await rds.publish(RedisChannels.PROMPT_INVALIDATION.value, str(prompt_id))
+
+
+async def listen_invalidations(rds: Redis) -> None:
+    """Drops templates changed by other workers; runs for the app lifetime.
+
+    Polls with a read timeout shorter than the pool's socket timeout, so an
+    idle channel is not mistaken for a dropped connection. The cache is
+    cleared only after a reconnect, since messages published while we were
+    disconnected are lost."""
+    reconnect = False
+    while True:
+        try:
+            async with rds.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(RedisChannels.PROMPT_INVALIDATION.value)
+                if reconnect:
+                    prompt_cache.clear()
+                reconnect = True
+                while True:
+                    message = await pubsub.get_message(timeout=_LISTEN_POLL_S)
+                    if message is not None:
+                        prompt_cache.invalidate(int(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("prompt_cache :: invalidation listener: %s", fmt_err(e))
+            await asyncio.sleep(1.0)
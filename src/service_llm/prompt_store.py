@@ -0,0 +1,96 @@
+import logging
+from typing import Final
+
+from redis.asyncio import Redis
+
+from src.common.redis_utils import LuaScript
+from src.dto.redis_models import RedisNamespace
+
+logger: Final = logging.getLogger(__name__)
+
+"""
+A prompt lives in the hash `{prompt_id}` with one field per version,
+`{prompt_id}v{version}`. The newest version number is kept in
+`prompt_latest:{prompt_id}` so that adding or resolving a version never
+scans the hash. Prompts written before the counter existed get it
+rebuilt from the hash fields once, inside the same script.
+"""
+
+LATEST_FROM_HASH = """
+local function latest_from_hash(prompt_key)
+    local latest = -1
+    for _, field in ipairs(redis.call('HKEYS', prompt_key)) do
+        local version = tonumber(string.match(field, 'v(%d+)$'))
+        if version and version > latest then
+            latest = version
+        end
+    end
+    return latest
+end
+"""
+
+_CREATE_PROMPT: Final = LuaScript(
+    """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1] .. 'v0', ARGV[2])
+redis.call('SET', KEYS[2], 0)
+return 1
+"""
+)
+
+_ADD_PROMPT_VERSION: Final = LuaScript(
+    LATEST_FROM_HASH
+    + """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    redis.call('SET', KEYS[2], latest_from_hash(KEYS[1]))
+end
+local version = redis.call('INCR', KEYS[2])
+redis.call('HSET', KEYS[1], ARGV[1] .. 'v' .. version, ARGV[2])
+return version
+"""
+)
+
+_LATEST_PROMPT_VERSION: Final = LuaScript(
+    LATEST_FROM_HASH
+    + """
+local latest = redis.call('GET', KEYS[2])
+if latest then
+    return tonumber(latest)
+end
+latest = latest_from_hash(KEYS[1])
+if latest < 0 then
+    return false
+end
+redis.call('SET', KEYS[2], latest)
+return latest
+"""
+)
+
+
+def _keys(prompt_id: int) -> list[str]:
+    return [str(prompt_id), f"{RedisNamespace.PROMPT_LATEST.value}:{prompt_id}"]
+
+
+async def create_prompt(prompt_id: int, prompt_template: str, rds: Redis) -> bool:
+    """Atomically stores version 0; False if the prompt already exists."""
+    return bool(
+        await _CREATE_PROMPT(
+            rds, keys=_keys(prompt_id), args=[prompt_id, prompt_template]
+        )
+    )
+
+
+async def add_prompt_version(prompt_id: int, prompt_template: str, rds: Redis) -> int:
+    """Atomically stores the template as the next version and returns it."""
+    return int(
+        await _ADD_PROMPT_VERSION(
+            rds, keys=_keys(prompt_id), args=[prompt_id, prompt_template]
+        )
+    )
+
+
+async def latest_prompt_version(prompt_id: int, rds: Redis) -> int | None:
+    latest = await _LATEST_PROMPT_VERSION(rds, keys=_keys(prompt_id))
+    return None if latest is None else int(latest)
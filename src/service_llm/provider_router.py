@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Final, TypeVar
+
+from src.dto.llm_info import Provider
+from src.env import settings
+from src.errors import fmt_err
+from src.service_llm.llm_clients import client_settings
+
+logger: Final = logging.getLogger(__name__)
+
+TR = TypeVar("TR")
+
+
+@dataclass(frozen=True)
+class Routing:
+    """Opt-in failover: `fallbacks` are tried in order after the primary.
+
+    With `hedge`, a fallback is also started when the provider in flight
+    has not answered within its recent p95 latency."""
+
+    fallbacks: tuple[Provider, ...] = ()
+    hedge: bool = False
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies per provider.
+
+    Fed by the provider scheduler with the duration of the attempt itself,
+    so quota waits and retry backoff do not inflate the hedge delay."""
+
+    def __init__(self, window: int) -> None:
+        self._window = window
+        self._samples: dict[Provider, deque[float]] = {}
+
+    def observe(self, provider: Provider, seconds: float) -> None:
+        samples = self._samples.get(provider)
+        if samples is None:
+            samples = self._samples[provider] = deque(maxlen=self._window)
+        samples.append(seconds)
+
+    def quantile(self, provider: Provider, q: float) -> float | None:
+        samples = self._samples.get(provider)
+        if not samples or len(samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            provider.value: {
+                "samples": len(samples),
+                "p50": self.quantile(provider, 0.5) or 0.0,
+                "p95": self.quantile(provider, 0.95) or 0.0,
+            }
+            for provider, samples in self._samples.items()
+        }
+
+
+latency_tracker: Final = LatencyTracker(window=settings.HEDGE_LATENCY_WINDOW)
+
+
+def hedge_delay(provider: Provider) -> float:
+    p95 = latency_tracker.quantile(provider, 0.95)
+    if p95 is None:
+        return settings.HEDGE_DEFAULT_DELAY_S
+    return max(settings.HEDGE_MIN_DELAY_S, p95)
+
+
+def route_providers(provider: Provider, routing: Routing) -> list[Provider]:
+    """Primary first, then fallbacks, skipping ones served by the same client."""
+    providers: list[Provider] = []
+    for candidate in (provider, *routing.fallbacks):
+        resolved = client_settings(candidate).provider
+        if resolved not in providers:
+            providers.append(resolved)
+    return providers
+
+
+async def call_routed(
+    provider: Provider,
+    routing: Routing,
+    call: Callable[[Provider], Awaitable[TR]],
+) -> tuple[TR, Provider]:
+    """Runs `call` on the primary provider, failing over or hedging to the
+    fallbacks; returns the first successful result and who served it."""
+    providers = route_providers(provider, routing)
+    if len(providers) == 1:
+        return await call(providers[0]), providers[0]
+
+    running: dict[asyncio.Task[TR], Provider] = {}
+    next_idx = 0
+    last_error: BaseException | None = None
+
+    def _start() -> Provider:
+        nonlocal next_idx
+        candidate = providers[next_idx]
+        next_idx += 1
+        running[asyncio.create_task(call(candidate))] = candidate
+        return candidate
+
+    latest = _start()
+    try:
+        while running:
+            timeout = (
+                hedge_delay(latest)
+                if routing.hedge and next_idx < len(providers)
+                else None
+            )
+            done, _ = await asyncio.wait(
+                running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                latest = _start()
+                logger.info("hedging :: %s started after %0.2fs", latest.value, timeout)
+                continue
+            for task in done:
+                served_by = running.pop(task)
+                if task.exception() is None:
+                    return task.result(), served_by
+                last_error = task.exception()
+                logger.warning(
+                    "failover :: %s failed: %s",
+                    served_by.value,
+                    fmt_err(last_error),  # type: ignore
+                )
+            if not running and next_idx < len(providers):
+                latest = _start()
+    finally:
+        for task in running:
+            task.cancel()
+    raise last_error  # type: ignore
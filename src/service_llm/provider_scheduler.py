@@ -0,0 +1,235 @@
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import Final, TypeVar
+
+import openai
+from redis.asyncio import Redis
+
+from src.common.redis_utils import LuaScript
+from src.dto.llm_info import Provider
+from src.dto.redis_models import RedisNamespace
+from src.env import settings
+from src.errors import fmt_err
+from src.metrics import LLM_IN_FLIGHT, LLM_LATENCY
+from src.service_llm.llm_clients import client_settings
+from src.service_llm.provider_router import latency_tracker
+
+logger: Final = logging.getLogger(__name__)
+
+TR = TypeVar("TR")
+
+_RETRYABLE: Final = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+# KEYS: requests and tokens counters of the current minute
+# ARGV: tokens to take, rpm, tpm
+_TAKE_SHARED: Final = LuaScript(
+    """
+local requests = redis.call('INCR', KEYS[1])
+local tokens = redis.call('INCRBY', KEYS[2], ARGV[1])
+if requests == 1 then
+    redis.call('EXPIRE', KEYS[1], 120)
+    redis.call('EXPIRE', KEYS[2], 120)
+end
+if requests > tonumber(ARGV[2]) or tokens > tonumber(ARGV[3]) then
+    redis.call('DECR', KEYS[1])
+    redis.call('DECRBY', KEYS[2], ARGV[1])
+    return 0
+end
+return 1
+"""
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 characters per token."""
+    return len(text) // 4 + 1
+
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    rpm: int
+    tpm: int
+    max_concurrency: int
+
+
+def provider_limits(provider: Provider) -> ProviderLimits:
+    match provider:
+        case Provider.deepseek:
+            return ProviderLimits(
+                rpm=settings.DEEPSEEK_RPM,
+                tpm=settings.DEEPSEEK_TPM,
+                max_concurrency=settings.DEEPSEEK_MAX_CONCURRENCY,
+            )
+        case _:
+            return ProviderLimits(
+                rpm=settings.OPENAI_RPM,
+                tpm=settings.OPENAI_TPM,
+                max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+            )
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, bursting up to one minute."""
+
+    def __init__(self, per_minute: int) -> None:
+        self._capacity = float(max(1, per_minute))
+        self._rate = self._capacity / 60.0
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+
+    def try_take(self, amount: float) -> float:
+        """Takes `amount` and returns 0, or returns seconds until it fits."""
+        amount = min(amount, self._capacity)
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return 0.0
+        return (amount - self._tokens) / self._rate
+
+    def give_back(self, amount: float) -> None:
+        self._tokens = min(self._capacity, self._tokens + amount)
+
+
+def _retry_after(err: Exception) -> float | None:
+    response = getattr(err, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class ProviderScheduler:
+    """Keeps calls to one provider under its request/token quotas.
+
+    Every call waits for a request and a token from local token buckets
+    (optionally also from fleet-wide per-minute counters in Redis), then
+    for a concurrency slot. Retryable provider errors are retried with
+    full-jitter exponential backoff, never sooner than Retry-After."""
+
+    def __init__(self, provider: Provider, limits: ProviderLimits) -> None:
+        self.provider = provider
+        self.model = client_settings(provider).model
+        self.limits = limits
+        self._requests = TokenBucket(limits.rpm)
+        self._tokens = TokenBucket(limits.tpm)
+        self._semaphore = asyncio.Semaphore(max(1, limits.max_concurrency))
+        self.in_flight = 0
+
+    async def _take_local(self, tokens: int) -> None:
+        while True:
+            wait = self._requests.try_take(1)
+            if wait == 0:
+                wait = self._tokens.try_take(tokens)
+                if wait == 0:
+                    return
+                self._requests.give_back(1)
+            await asyncio.sleep(wait)
+
+    async def _take_shared(self, tokens: int, rds: Redis) -> None:
+        # like the local bucket, a call larger than a whole minute's quota
+        # takes all of it instead of waiting forever
+        tokens = min(tokens, self.limits.tpm)
+        while True:
+            minute = int(time.time() // 60)
+            prefix = f"{RedisNamespace.LLM_RATE.value}:{self.provider.value}:{minute}"
+            taken = await _TAKE_SHARED(
+                rds,
+                keys=[f"{prefix}:requests", f"{prefix}:tokens"],
+                args=[tokens, self.limits.rpm, self.limits.tpm],
+            )
+            if taken:
+                return
+            await asyncio.sleep(60 - time.time() % 60 + random.random() * 0.5)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tokens: int, rds: Redis | None = None) -> AsyncIterator[None]:
+        await self._take_local(tokens)
+        if rds is not None and settings.LLM_RATE_LIMIT_SHARED:
+            await self._take_shared(tokens, rds)
+        async with self._semaphore:
+            in_flight = LLM_IN_FLIGHT.labels(
+                provider=self.provider.value, model=self.model
+            )
+            self.in_flight += 1
+            in_flight.inc()
+            started_at = time.perf_counter()
+            outcome = "error"
+            try:
+                yield
+                outcome = "ok"
+            finally:
+                self.in_flight -= 1
+                in_flight.dec()
+                LLM_LATENCY.labels(
+                    provider=self.provider.value, model=self.model, outcome=outcome
+                ).observe(time.perf_counter() - started_at)
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[TR]],
+        tokens: int,
+        rds: Redis | None = None,
+    ) -> TR:
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(tokens, rds):
+                    started_at = time.perf_counter()
+                    result = await func()
+                    latency_tracker.observe(
+                        self.provider, time.perf_counter() - started_at
+                    )
+                    return result
+            except _RETRYABLE as e:
+                if attempt >= settings.LLM_MAX_RETRIES:
+                    raise
+                backoff = random.uniform(
+                    0,
+                    min(
+                        settings.LLM_BACKOFF_MAX_S,
+                        settings.LLM_BACKOFF_BASE_S * 2**attempt,
+                    ),
+                )
+                delay = max(backoff, _retry_after(e) or 0.0)
+                attempt += 1
+                logger.warning(
+                    "%s :: retry %s in %0.2fs after %s",
+                    self.provider.value,
+                    attempt,
+                    delay,
+                    fmt_err(e),
+                )
+                await asyncio.sleep(delay)
+
+
+_schedulers: dict[Provider, ProviderScheduler] = {}
+
+
+def scheduler_for(provider: Provider) -> ProviderScheduler:
+    provider = client_settings(provider).provider
+    scheduler = _schedulers.get(provider)
+    if scheduler is None:
+        scheduler = ProviderScheduler(provider, provider_limits(provider))
+        _schedulers[provider] = scheduler
+    return scheduler
@@ -0,0 +1,103 @@
+import logging
+from dataclasses import dataclass
+from typing import Final
+
+from redis.asyncio import Redis
+
+from src.app_api.models.response_models.response_info import ResponseLLMApiMdl
+from src.common.redis_utils import LuaScript
+from src.dto.redis_models import RedisNamespace
+from src.service_llm.llm_cache import decode_cached_response, migrate_legacy_record
+from src.service_llm.prompt_store import LATEST_FROM_HASH
+
+logger: Final = logging.getLogger(__name__)
+
+# KEYS: cache key ('' when not caching), prompt hash, latest-version counter
+# ARGV: prompt id, version ('' for latest), '1' when the template is needed
+_LOOKUP_QUERY: Final = LuaScript(
+    LATEST_FROM_HASH
+    + """
+if KEYS[1] ~= '' then
+    local kind = redis.call('TYPE', KEYS[1])['ok']
+    if kind == 'string' then
+        return {'hit', redis.call('GET', KEYS[1])}
+    elseif kind == 'hash' then
+        return {'legacy', redis.call('HGETALL', KEYS[1])}
+    end
+end
+local version = ARGV[2]
+if version == '' then
+    local latest = redis.call('GET', KEYS[3])
+    if not latest then
+        latest = latest_from_hash(KEYS[2])
+        if latest < 0 then
+            return {'missing'}
+        end
+        redis.call('SET', KEYS[3], latest)
+    end
+    version = tostring(latest)
+end
+if ARGV[3] ~= '1' then
+    return {'version', version}
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return {'missing'}
+end
+local template = redis.call('HGET', KEYS[2], ARGV[1] .. 'v' .. version)
+if not template then
+    return {'version', version}
+end
+return {'template', version, template}
+"""
+)
+
+
+@dataclass
+class QueryLookup:
+    cached: ResponseLLMApiMdl | None = None
+    prompt_missing: bool = False
+    version: int | None = None
+    template: str | None = None
+
+
+async def lookup_query(
+    prompt_id: int,
+    version: int | None,
+    cache_key: str,
+    need_template: bool,
+    rds: Redis,
+) -> QueryLookup:
+    """Everything `create_query` needs from Redis in one round-trip.
+
+    Returns the cached response if `cache_key` holds one; otherwise the
+    resolved version (latest when `version` is None) with its template,
+    or `prompt_missing` when the prompt does not exist."""
+    if len(cache_key) == 0 and not need_template and version is not None:
+        return QueryLookup(version=version)
+
+    reply = await _LOOKUP_QUERY(
+        rds,
+        keys=[
+            cache_key,
+            str(prompt_id),
+            f"{RedisNamespace.PROMPT_LATEST.value}:{prompt_id}",
+        ],
+        args=[
+            prompt_id,
+            "" if version is None else version,
+            "1" if need_template else "0",
+        ],
+    )
+    kind = reply[0].decode("utf-8")
+    match kind:
+        case "hit":
+            return QueryLookup(cached=decode_cached_response(reply[1]))
+        case "legacy":
+            record = dict(zip(reply[1][::2], reply[1][1::2]))
+            return QueryLookup(cached=migrate_legacy_record(cache_key, record, rds))
+        case "missing":
+            return QueryLookup(prompt_missing=True)
+        case "version":
+            return QueryLookup(version=int(reply[1]))
+        case _:
+            return QueryLookup(version=int(reply[1]), template=reply[2].decode("utf-8"))
@@ -0,0 +1,51 @@
+import asyncio
+
+import openai
+import pytest
+
+from src.env import settings
+from src.service_llm.circuit_breaker import (
+    BreakerState,
+    CircuitBreaker,
+    CircuitOpenError,
+    guarded,
+)
+
+
+def test_circuit_breaker(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "BREAKER_ERROR_RATE", 0.5)
+    monkeypatch.setattr(settings, "BREAKER_OPEN_S", 0.0)
+    monkeypatch.setattr(settings, "BREAKER_HALF_OPEN_CALLS", 1)
+    breaker = CircuitBreaker("openai/test")
+
+    async def ok() -> str:
+        return "ok"
+
+    async def down() -> str:
+        raise TimeoutError()
+
+    async def bad_request() -> str:
+        raise ValueError("bad")
+
+    async def main() -> None:
+        assert await guarded(breaker, ok) == "ok"
+        with pytest.raises(ValueError):
+            await guarded(breaker, bad_request)
+        with pytest.raises(TimeoutError):
+            await guarded(breaker, down)
+        assert breaker.state == BreakerState.CLOSED
+        with pytest.raises(TimeoutError):
+            await guarded(breaker, down)
+        # 4 calls, 2 outage failures -> open, then half-open after BREAKER_OPEN_S
+        assert breaker._state == BreakerState.OPEN
+        assert breaker.state == BreakerState.HALF_OPEN
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.on_failure(openai.APITimeoutError(request=None))  # type: ignore[arg-type]
+        assert breaker._state == BreakerState.OPEN
+        assert await guarded(breaker, ok) == "ok"
+        assert breaker.state == BreakerState.CLOSED
+
+    asyncio.run(main())
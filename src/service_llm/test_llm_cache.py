@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime
+
+import fakeredis.aioredis
+
+from src.app_api.models.request_models.request_info import LLMRequestParametersApiMdl
+from src.app_api.models.response_models.response_info import ResponseLLMApiMdl
+from src.dto.llm_info import Exclude, Provider
+from src.service_llm.llm_cache import (
+    _flight_lock_key,
+    acquire_flight_lock,
+    auto_cache_key,
+    decode_cached_response,
+    decode_legacy_cached_response,
+    encode_cached_response,
+    is_auto_cache_key,
+    release_flight_lock,
+)
+
+
+def test_auto_cache_key() -> None:
+    params = LLMRequestParametersApiMdl(
+        text="hello Acme",
+        context="greeting",
+        exclude=Exclude(exception="", exceptions_list=["Acme", "Corp"]),
+        variants=2,
+        temperature=0,
+    )
+    key = auto_cache_key(1, params, Provider.openai, "en")
+
+    assert is_auto_cache_key(key)
+    reordered = params.model_copy(
+        update={"exclude": Exclude(exception="", exceptions_list=["Corp", "Acme"])}
+    )
+    assert auto_cache_key(1, reordered, Provider.openai, "en") == key
+    assert auto_cache_key(1, params, Provider.deepseek, "en") != key
+    assert auto_cache_key(1, params, Provider.openai, "ru") != key
+    hotter = params.model_copy(update={"temperature": 1})
+    assert auto_cache_key(1, hotter, Provider.openai, "en") != key
+
+    normalized = auto_cache_key(1, params, Provider.openai, "en", normalized=True)
+    spaced = params.model_copy(update={"text": " hello\u00a0 Acme\n"})
+    assert auto_cache_key(1, spaced, Provider.openai, "en") != key
+    assert auto_cache_key(1, spaced, Provider.openai, "en", True) == normalized
+    for other in ("Hello Acme", "hello Acme!", "hello not Acme"):
+        changed = params.model_copy(update={"text": other})
+        assert auto_cache_key(1, changed, Provider.openai, "en", True) != normalized
+
+
+def test_cached_response_record() -> None:
+    response = ResponseLLMApiMdl(
+        prompt_id=1,
+        translations=['it\'s "quoted"', "line\nbreak"],
+        error="",
+        provider=Provider.deepseek,
+        created_at=datetime(2024, 1, 1, 12, 30),
+    )
+    assert decode_cached_response(encode_cached_response(response)) == response
+
+    legacy = {
+        b"prompt_id": b"1",
+        b"translations": str(response.translations).encode("utf-8"),
+        b"error": b"",
+        b"provider": b"deepseek",
+        b"created_at": str(response.created_at).encode("utf-8"),
+    }
+    assert decode_legacy_cached_response(legacy) == response
+
+
+def test_flight_lock() -> None:
+    async def main() -> None:
+        rds = fakeredis.aioredis.FakeRedis()
+        token = await acquire_flight_lock("k", rds)
+        assert token is not None and await acquire_flight_lock("k", rds) is None
+
+        # our lock expired and another worker took it over
+        await rds.set(_flight_lock_key("k"), "other")
+        await release_flight_lock("k", token, rds)
+        assert await rds.get(_flight_lock_key("k")) == b"other"
+        await release_flight_lock("k", "other", rds)
+        assert await acquire_flight_lock("k", rds) is not None
+
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+import asyncio
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+
+from src.app_api.models.request_models.request_info import (
+    LLMJobRequestMdl,
+    LLMRequestParametersApiMdl,
+)
+from src.app_api.models.response_models.response_info import (
+    JobStatus,
+    ResponseLLMApiMdl,
+)
+from src.conftest import FakeLLM
+from src.dto.llm_info import Exclude, Provider
+from src.env import settings
+from src.service_llm import llm_jobs, llm_manager
+
+
+def test_llm_job(monkeypatch: pytest.MonkeyPatch, rds: FakeRedis) -> None:
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    outcomes = ["APITimeoutError: timed out", ""]
+
+    async def create_query(*args: Any, **kwargs: Any) -> ResponseLLMApiMdl:
+        error = outcomes.pop(0)
+        return ResponseLLMApiMdl(
+            prompt_id=1,
+            translations=[] if error else ["hola"],
+            error=error,
+            provider=Provider.openai,
+            created_at=datetime.now(),
+        )
+
+    monkeypatch.setattr(llm_manager, "create_query", create_query)
+    request = LLMJobRequestMdl(
+        prompt_id=1,
+        lang_abbr="es",
+        params=LLMRequestParametersApiMdl(
+            text="hello",
+            context="",
+            exclude=Exclude(exception="", exceptions_list=[]),
+            variants=1,
+            temperature=0,
+        ),
+    )
+
+    async def main() -> None:
+        queue: list[str] = []
+
+        async def enqueue(job_id: str) -> None:
+            queue.append(job_id)
+
+        job = await llm_jobs.submit_job(request, rds, enqueue)
+        assert queue == [job.job_id] and job.status == JobStatus.QUEUED
+
+        assert await llm_jobs.run_job(job.job_id, 1, rds)  # retryable error
+        waiting = asyncio.create_task(llm_jobs.get_job(job.job_id, 5, rds))
+        assert not await llm_jobs.run_job(job.job_id, 2, rds)
+        done = await waiting
+        assert done is not None and done.status == JobStatus.DONE
+        assert (
+            done.attempts == 2 and done.result and done.result.translations == ["hola"]
+        )
+        assert not await llm_jobs.run_job(job.job_id, 3, rds)  # redelivery is a no-op
+        assert await llm_jobs.get_job("missing", 0, rds) is None
+
+    asyncio.run(main())
+
+
+def test_llm_job_retry_is_not_replayed(
+    monkeypatch: pytest.MonkeyPatch,
+    rds: FakeRedis,
+    fake_llm: FakeLLM,
+    prompt: int,
+    make_params: Callable[..., LLMRequestParametersApiMdl],
+) -> None:
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    outcomes: list[str | BaseException] = [RuntimeError("provider down"), "hola"]
+    fake_llm.reply = lambda text: outcomes.pop(0)
+    request = LLMJobRequestMdl(
+        prompt_id=prompt, lang_abbr="es", cache_key="job-retry", params=make_params()
+    )
+
+    async def main() -> None:
+        async def enqueue(job_id: str) -> None:
+            pass
+
+        job = await llm_jobs.submit_job(request, rds, enqueue)
+        assert await llm_jobs.run_job(job.job_id, 1, rds)
+        assert not await llm_jobs.run_job(job.job_id, 2, rds)
+        done = await llm_jobs.get_job(job.job_id, 0, rds)
+        assert done is not None and done.status == JobStatus.DONE
+        assert done.result and done.result.translations == ["hola"]
+
+    asyncio.run(main())
+    assert outcomes == []
@@ -0,0 +1,147 @@
+import asyncio
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from fakeredis.aioredis import FakeRedis
+from prometheus_client import REGISTRY
+
+from src.app_api.models.request_models.request_info import LLMRequestParametersApiMdl
+from src.conftest import FakeLLM
+from src.dto.llm_info import Provider
+from src.env import settings
+from src.service_llm import llm_manager, prompt_store
+from src.service_llm.llm_manager import (
+    KeepTagStripper,
+    unwrap_kept_words,
+    wrap_excluded_words,
+)
+
+
+def test_keep_tag_stripper() -> None:
+    text = "Say <keep>Acme</keep> twice: <keep>Acme</keep> < 3 <b>"
+    for size in range(1, len(text) + 1):
+        stripper = KeepTagStripper()
+        out = "".join(
+            stripper.feed(text[i : i + size]) for i in range(0, len(text), size)
+        )
+        assert out + stripper.flush() == unwrap_kept_words(text)
+
+    stripper = KeepTagStripper()
+    assert stripper.feed("a </ke") == "a "
+    assert stripper.flush() == "</ke"
+
+
+def test_wrap_excluded_words() -> None:
+    assert wrap_excluded_words("Say Acme Inc", []) == "Say Acme Inc"
+    assert wrap_excluded_words("Say Acme Inc", [""]) == "Say Acme Inc"
+    assert (
+        wrap_excluded_words("Acme and Acme Inc", ["Acme", "Acme Inc"])
+        == "<keep>Acme</keep> and <keep>Acme Inc</keep>"
+    )
+
+
+def test_failed_generation_is_not_cached(
+    rds: FakeRedis,
+    fake_llm: FakeLLM,
+    prompt: int,
+    make_params: Callable[..., LLMRequestParametersApiMdl],
+) -> None:
+    outcomes: list[str | BaseException] = [RuntimeError("provider down"), "hola"]
+    fake_llm.reply = lambda text: outcomes.pop(0)
+
+    async def _run() -> list[Any]:
+        return [
+            await llm_manager.create_query(
+                prompt,
+                make_params(),
+                Provider.openai,
+                "",
+                "es",
+                rds,
+                {},
+                auto_cache=True,
+            )
+            for _ in range(2)
+        ]
+
+    failed, retried = asyncio.run(_run())
+    assert failed.error and not failed.translations
+    assert retried.translations == ["hola"] and not retried.error
+    assert outcomes == []
+
+
+def test_invalid_stored_template_is_counted_once(
+    rds: FakeRedis, make_params: Callable[..., LLMRequestParametersApiMdl]
+) -> None:
+    def invalid_count() -> float:
+        return (
+            REGISTRY.get_sample_value("llm_prompt_errors_total", {"reason": "invalid"})
+            or 0.0
+        )
+
+    async def _run() -> list[Any]:
+        # written before templates were validated
+        await prompt_store.create_prompt(1, "{lang_abbr}: {txt}", rds)
+        return [
+            await llm_manager.create_query(
+                1, make_params(), Provider.openai, "", "es", rds, {}
+            )
+            for _ in range(3)
+        ]
+
+    before = invalid_count()
+    responses = asyncio.run(_run())
+    assert all(r.error == "prompt_template is invalid" for r in responses)
+    assert invalid_count() == before + 1
+
+
+def test_legacy_template_without_text_serves(
+    rds: FakeRedis,
+    fake_llm: FakeLLM,
+    make_params: Callable[..., LLMRequestParametersApiMdl],
+) -> None:
+    async def _run() -> Any:
+        # written before {text} was required
+        await prompt_store.create_prompt(1, "Say hi in {lang_abbr}", rds)
+        return await llm_manager.create_query(
+            1, make_params(), Provider.openai, "", "es", rds, {}
+        )
+
+    response = asyncio.run(_run())
+    assert response.translations == ["SAY HI IN ES"] and not response.error
+
+
+def test_chunked_query_keeps_segment_order(
+    monkeypatch: pytest.MonkeyPatch,
+    rds: FakeRedis,
+    fake_llm: FakeLLM,
+    prompt: int,
+    make_params: Callable[..., LLMRequestParametersApiMdl],
+) -> None:
+    paragraphs = ["First paragraph.", "The second one.", "Third and last."]
+    text = f"{paragraphs[0]}\n\n{paragraphs[1]}\n \n\n{paragraphs[2]}"
+    monkeypatch.setattr(settings, "LLM_SEGMENT_MAX_TOKENS", 5)
+    answer = fake_llm.ainvoke
+    in_flight, peak = 0, 0
+
+    async def ainvoke(prompt: str) -> Any:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # later segments answer first
+        index = next(i for i, p in enumerate(paragraphs) if p in prompt)
+        await asyncio.sleep(0.01 * (len(paragraphs) - index))
+        in_flight -= 1
+        return await answer(prompt)
+
+    monkeypatch.setattr(fake_llm, "ainvoke", ainvoke)
+    response = asyncio.run(
+        llm_manager.create_query(
+            prompt, make_params(text), Provider.openai, "", "es", rds, {}, chunked=True
+        )
+    )
+    assert fake_llm.texts == paragraphs[::-1]
+    assert peak == 3
+    assert response.translations == [text.upper()] and not response.error
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+
+from src.dto.llm_info import compile_prompt_template
+from src.dto.redis_models import RedisChannels
+from src.service_llm import prompt_cache as prompt_cache_module
+from src.service_llm.prompt_cache import PromptTemplateCache
+
+
+def test_prompt_template_cache() -> None:
+    a, b, c = (compile_prompt_template(f"{name}: {{text}}") for name in "abc")
+    cache = PromptTemplateCache(max_size=2, ttl_s=60)
+    cache.put(1, "1v0", a)
+    cache.put(1, "1v1", b)
+    assert cache.get("1v0") is a
+    cache.put(2, "2v0", c)
+    assert cache.get("1v1") is None
+    assert cache.get("1v0") is a
+
+    cache.invalidate(1)
+    assert cache.get("1v0") is None
+    assert cache.get("2v0") is c
+
+    # read before an invalidation, stored after it: dropped
+    generation = cache.generation
+    cache.put_latest(1, 3, generation)
+    assert cache.get_latest(1) == 3
+    cache.invalidate(1)
+    cache.put_latest(1, 3, generation)
+    assert cache.get_latest(1) is None
+    cache.put_latest(1, 4, cache.generation)
+    assert cache.get_latest(1) == 4
+
+    expired = PromptTemplateCache(max_size=2, ttl_s=-1)
+    expired.put(1, "1v0", a)
+    assert expired.get("1v0") is None
+
+
+def test_listen_invalidations(monkeypatch: pytest.MonkeyPatch, rds: FakeRedis) -> None:
+    monkeypatch.setattr(prompt_cache_module, "_LISTEN_POLL_S", 0.01)
+    cache = prompt_cache_module.prompt_cache
+    template = compile_prompt_template("{text}")
+
+    async def main() -> None:
+        cache.put(1, "1v0", template)
+        cache.put(2, "2v0", template)
+        listener = asyncio.create_task(prompt_cache_module.listen_invalidations(rds))
+        await asyncio.sleep(0.1)  # subscribed, then idle for several polls
+        await rds.publish(RedisChannels.PROMPT_INVALIDATION.value, "1")
+        await asyncio.sleep(0.1)
+        listener.cancel()
+        assert cache.get("1v0") is None
+        assert cache.get("2v0") is template
+
+    asyncio.run(main())
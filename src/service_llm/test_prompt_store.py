@@ -0,0 +1,39 @@
+import asyncio
+
+from fakeredis.aioredis import FakeRedis
+
+from src.service_llm import prompt_store
+
+
+def test_prompt_versions(rds: FakeRedis) -> None:
+    async def main() -> None:
+        assert await prompt_store.create_prompt(1, "v0 {text}", rds)
+        assert not await prompt_store.create_prompt(1, "again {text}", rds)
+        versions = await asyncio.gather(
+            *(
+                prompt_store.add_prompt_version(1, f"{{text}} {i}", rds)
+                for i in range(10)
+            )
+        )
+        assert sorted(versions) == list(range(1, 11))
+        # v10 is newer than v9, not older as a string comparison would have it
+        assert await prompt_store.latest_prompt_version(1, rds) == 10
+        assert await rds.hlen("1") == 11
+
+    asyncio.run(main())
+
+
+def test_legacy_latest_counter_is_rebuilt(rds: FakeRedis) -> None:
+    async def main() -> None:
+        # written before the counter existed
+        await rds.hset("2", mapping={"2v0": "a", "2v9": "b", "2v10": "c"})
+        assert await prompt_store.latest_prompt_version(2, rds) == 10
+        assert await rds.get("prompt_latest:2") == b"10"
+
+        await rds.hset("3", mapping={"3v0": "a", "3v9": "b", "3v10": "c"})
+        assert await prompt_store.add_prompt_version(3, "d", rds) == 11
+        assert await rds.hget("3", "3v11") == b"d"
+
+        assert await prompt_store.latest_prompt_version(4, rds) is None
+
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from src.dto.llm_info import Provider
+from src.env import settings
+from src.service_llm.provider_router import Routing, call_routed, route_providers
+
+
+def test_route_providers() -> None:
+    routing = Routing(fallbacks=(Provider.gemini, Provider.deepseek))
+    assert route_providers(Provider.openai, routing) == [
+        Provider.openai,
+        Provider.deepseek,
+    ]
+
+
+def test_call_routed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "HEDGE_DEFAULT_DELAY_S", 0.01)
+    delays = {Provider.openai: 1.0, Provider.deepseek: 0.0}
+
+    async def call(provider: Provider) -> str:
+        await asyncio.sleep(delays[provider])
+        return provider.value
+
+    async def failing(provider: Provider) -> str:
+        if provider == Provider.openai:
+            raise ValueError("down")
+        return provider.value
+
+    fallback = (Provider.deepseek,)
+    assert asyncio.run(
+        call_routed(Provider.openai, Routing(fallback, hedge=True), call)
+    ) == ("deepseek", Provider.deepseek)
+    assert asyncio.run(call_routed(Provider.openai, Routing(fallback), failing)) == (
+        "deepseek",
+        Provider.deepseek,
+    )
+    with pytest.raises(ValueError):
+        asyncio.run(call_routed(Provider.openai, Routing(), failing))
@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+from fakeredis.aioredis import FakeRedis
+
+from src.dto.llm_info import Provider
+from src.env import settings
+from src.service_llm import provider_scheduler
+from src.service_llm.provider_router import LatencyTracker
+from src.service_llm.provider_scheduler import (
+    ProviderLimits,
+    ProviderScheduler,
+    TokenBucket,
+)
+
+
+def test_token_bucket() -> None:
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.try_take(60) == 0
+    assert 0.9 < bucket.try_take(1) <= 1.0
+    bucket.give_back(1)
+    assert bucket.try_take(1) == 0
+
+
+def test_scheduler_retries_rate_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "LLM_BACKOFF_BASE_S", 0.001)
+    monkeypatch.setattr(settings, "HEDGE_MIN_SAMPLES", 1)
+    tracker = LatencyTracker(window=10)
+    monkeypatch.setattr(provider_scheduler, "latency_tracker", tracker)
+    calls = 0
+
+    async def flaky() -> str:
+        nonlocal calls
+        calls += 1
+        if calls < 3:
+            response = httpx.Response(
+                429,
+                headers={"retry-after-ms": "50"},
+                request=httpx.Request("POST", "http://llm"),
+            )
+            raise openai.RateLimitError("slow down", response=response, body=None)
+        return "ok"
+
+    scheduler = ProviderScheduler(
+        Provider.openai, ProviderLimits(rpm=600, tpm=10_000, max_concurrency=2)
+    )
+    assert asyncio.run(scheduler.call(flaky, tokens=10)) == "ok"
+    assert calls == 3
+    assert scheduler.in_flight == 0
+    # only the successful attempt is observed, not the retry backoff
+    latency = tracker.snapshot()["openai"]
+    assert latency["samples"] == 1 and latency["p95"] < 0.05
+
+
+def test_shared_quota_takes_oversized_call(
+    monkeypatch: pytest.MonkeyPatch, rds: FakeRedis
+) -> None:
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_SHARED", True)
+    scheduler = ProviderScheduler(
+        Provider.openai, ProviderLimits(rpm=600, tpm=100, max_concurrency=2)
+    )
+
+    async def call() -> str:
+        return "ok"
+
+    result = asyncio.run(
+        asyncio.wait_for(scheduler.call(call, tokens=1_000, rds=rds), timeout=5)
+    )
+    assert result == "ok"
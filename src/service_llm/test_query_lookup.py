@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime
+
+from fakeredis.aioredis import FakeRedis
+
+from src.app_api.models.response_models.response_info import ResponseLLMApiMdl
+from src.dto.llm_info import Provider
+from src.service_llm import prompt_store
+from src.service_llm.llm_cache import encode_cached_response
+from src.service_llm.query_lookup import QueryLookup, lookup_query
+
+
+def test_lookup_query(rds: FakeRedis) -> None:
+    response = ResponseLLMApiMdl(
+        prompt_id=1,
+        translations=["hola"],
+        error="",
+        provider=Provider.openai,
+        created_at=datetime(2024, 1, 1, 12, 30),
+    )
+
+    async def main() -> None:
+        await prompt_store.create_prompt(1, "v0 {text}", rds)
+        await prompt_store.add_prompt_version(1, "v1 {text}", rds)
+
+        await rds.set("hit", encode_cached_response(response))
+        assert await lookup_query(1, None, "hit", True, rds) == QueryLookup(
+            cached=response
+        )
+
+        # a miss resolves the latest version and reads its template in the same call
+        assert await lookup_query(1, None, "miss", True, rds) == QueryLookup(
+            version=1, template="v1 {text}"
+        )
+        assert await lookup_query(1, 0, "miss", True, rds) == QueryLookup(
+            version=0, template="v0 {text}"
+        )
+        assert await lookup_query(1, None, "", False, rds) == QueryLookup(version=1)
+
+        await rds.hset(
+            "legacy",
+            mapping={
+                "prompt_id": "1",
+                "translations": "['hola']",
+                "error": "",
+                "provider": "openai",
+                "created_at": "2024-01-01 12:30:00",
+            },
+        )
+        assert await lookup_query(1, None, "legacy", True, rds) == QueryLookup(
+            cached=response
+        )
+        await asyncio.sleep(0.01)  # the record is rewritten in the background
+        assert await rds.type("legacy") == b"string"
+
+        missing = QueryLookup(prompt_missing=True)
+        assert await lookup_query(2, None, "miss", True, rds) == missing
+        assert await lookup_query(2, 0, "miss", True, rds) == missing
+
+    asyncio.run(main())
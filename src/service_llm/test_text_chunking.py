@@ -0,0 +1,51 @@
+from src.service_llm.provider_scheduler import estimate_tokens
+from src.service_llm.text_chunking import (
+    Segment,
+    join_segments,
+    merge_segments,
+    pack_runs,
+    split_sentences,
+    split_text,
+)
+
+
+def test_split_text() -> None:
+    text = (
+        "First sentence here. <keep>Acme Inc. Ltd.</keep> is kept! Third one?\n\n"
+        "A second paragraph with some words. And another sentence.\n"
+    )
+    assert split_text(text, 0) == [Segment(text)]
+    assert split_text(text, 1000) == [Segment(text)]
+
+    segments = split_text(text, 10)
+    assert "".join(s.text + s.separator for s in segments) == text
+    assert len(segments) > 2
+    for segment in segments:
+        assert segment.text.count("<keep>") == segment.text.count("</keep>")
+        assert estimate_tokens(segment.text) <= 10 or ". " not in segment.text
+    assert segments[1].text == "<keep>Acme Inc. Ltd.</keep> is kept!"
+
+    translated = [f" {s.text.upper()}\n" for s in segments]
+    assert join_segments(translated, segments) == text.upper()
+
+
+def test_split_sentences() -> None:
+    text = "Short one.\n\nShared disclaimer. Prices may change.\n"
+    segments = split_sentences(text)
+    assert [s.text for s in segments] == [
+        "Short one.",
+        "Shared disclaimer.",
+        "Prices may change.",
+    ]
+    assert split_sentences("Prices may change.") == [Segment("Prices may change.")]
+    assert (
+        join_segments(["Kurz.", "Hinweis.", "Preise ändern sich."], segments)
+        == "Kurz.\n\nHinweis. Preise ändern sich.\n"
+    )
+
+
+def test_pack_runs() -> None:
+    segments = split_sentences("One. Two. Three.\n\nFour.")
+    assert pack_runs(segments, [0, 1, 3], 100) == [[0, 1], [3]]
+    assert pack_runs(segments, [0, 1, 2, 3], 1) == [[0], [1], [2], [3]]
+    assert merge_segments(segments[1:3]) == Segment("Two. Three.", "\n\n")
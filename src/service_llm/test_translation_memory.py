@@ -0,0 +1,103 @@
+import asyncio
+from collections.abc import Callable
+from typing import Any
+
+from fakeredis.aioredis import FakeRedis
+
+from src.app_api.models.request_models.request_info import LLMRequestParametersApiMdl
+from src.conftest import FakeLLM
+from src.dto.llm_info import Provider
+from src.service_llm import llm_manager
+from src.service_llm.provider_scheduler import estimate_tokens
+from src.service_llm.translation_memory import memory_keys, recall, remember
+
+
+def test_translation_memory(rds: FakeRedis) -> None:
+    keys = memory_keys(
+        "1v0",
+        "de",
+        Provider.openai,
+        ["Prices may  change.", " Prices may change.\n", "prices may change."],
+    )
+    assert keys[0] == keys[1] != keys[2]
+    assert (
+        keys[0] != memory_keys("1v0", "fr", Provider.openai, ["Prices may change."])[0]
+    )
+
+    async def _run() -> list[str | None]:
+        await remember([(keys[0], "Preise können sich ändern.")], rds)
+        return await recall(keys, rds)
+
+    assert asyncio.run(_run()) == ["Preise können sich ändern."] * 2 + [None]
+
+
+def test_memory_reuses_sentences(
+    rds: FakeRedis,
+    fake_llm: FakeLLM,
+    prompt: int,
+    make_params: Callable[..., LLMRequestParametersApiMdl],
+) -> None:
+    async def _run() -> list[Any]:
+        responses = []
+        for text in ("Hello there. Prices may change.", "Bye.\n\nPrices may change."):
+            responses.append(
+                await llm_manager.create_query(
+                    prompt,
+                    make_params(text),
+                    Provider.openai,
+                    "",
+                    "de",
+                    rds,
+                    {},
+                    translation_memory=True,
+                )
+            )
+            await asyncio.sleep(0.01)  # the memory is written in the background
+        return responses
+
+    first, second = asyncio.run(_run())
+    assert first.translations == ["HELLO THERE. PRICES MAY CHANGE."]
+    assert second.translations == ["BYE.\n\nPRICES MAY CHANGE."]
+    assert second.memory_hit_ratio == 0.5
+    assert fake_llm.texts == ["Hello there. Prices may change.", "Bye."]
+
+
+def test_memory_packs_unknown_sentences(
+    rds: FakeRedis,
+    fake_llm: FakeLLM,
+    prompt: int,
+    make_params: Callable[..., LLMRequestParametersApiMdl],
+) -> None:
+    text = "First one. Second one. Prices may change. Last one."
+
+    async def _run() -> list[Any]:
+        responses = []
+        for query in ("Prices may change.", text, text):
+            responses.append(
+                await llm_manager.create_query(
+                    prompt,
+                    make_params(query),
+                    Provider.openai,
+                    "",
+                    "de",
+                    rds,
+                    {},
+                    translation_memory=True,
+                )
+            )
+            await asyncio.sleep(0.01)  # the memory is written in the background
+        return responses
+
+    _, partly, fully = asyncio.run(_run())
+    # one prompt per run of unknown neighbours, not one per sentence
+    assert fake_llm.texts == [
+        "Prices may change.",
+        "First one. Second one.",
+        "Last one.",
+    ]
+    assert partly.translations == [text.upper()]
+    assert partly.memory_hit_ratio == 0.25
+    assert partly.usage[0].prompt_tokens == estimate_tokens(
+        "de: First one. Second one."
+    ) + estimate_tokens("de: Last one.")
+    assert fully.translations == [text.upper()] and fully.memory_hit_ratio == 1
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from langchain_core.messages import AIMessage
+
+from src.app_api.models.response_models.response_info import UsageApiMdl
+from src.dto.llm_info import Provider
+from src.env import settings
+from src.service_llm.usage import get_usage, record_usage, usage_of
+
+
+def test_usage_of(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "OPENAI_PRICE_INPUT_1M", 1.0)
+    monkeypatch.setattr(settings, "OPENAI_PRICE_OUTPUT_1M", 4.0)
+    message = AIMessage(
+        content="hola",
+        usage_metadata={
+            "input_tokens": 1000,
+            "output_tokens": 500,
+            "total_tokens": 1500,
+        },
+    )
+    usage = usage_of(message, Provider.gemini)  # priced as its openai fallback
+    assert (usage.prompt_tokens, usage.completion_tokens) == (1000, 500)
+    assert usage.cost_usd == pytest.approx(0.003)
+    assert usage_of(AIMessage(content="hola"), Provider.openai).cost_usd == 0
+
+
+def test_record_usage_counts_variants(rds: FakeRedis) -> None:
+    segment = UsageApiMdl(prompt_tokens=10, completion_tokens=5, cost_usd=0.5)
+    # two variants: one translated in three segments, one with a fallback
+    responses = [
+        [(Provider.openai, segment)] * 3,
+        [(Provider.openai, segment), (Provider.deepseek, segment)],
+    ]
+    today = datetime.now(timezone.utc).date()
+
+    async def main() -> dict[Provider, tuple[int, int, int, float]]:
+        await record_usage("1v0", responses, rds)
+        await record_usage("2v0", [], rds)
+        stats = await get_usage(today, today, 1, rds)
+        return {
+            stat.provider: (
+                stat.requests,
+                stat.prompt_tokens,
+                stat.completion_tokens,
+                stat.cost_usd,
+            )
+            for stat in stats
+        }
+
+    assert asyncio.run(main()) == {
+        Provider.openai: (2, 40, 20, 2.0),
+        Provider.deepseek: (1, 10, 5, 0.5),
+    }
@@ -0,0 +1,125 @@
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Final
+
+from src.service_llm.provider_scheduler import estimate_tokens
+
+_KEEP: Final = re.compile(r"<keep>.*?</keep>", re.DOTALL)
+_PARAGRAPH_BREAK: Final = re.compile(r"\n[ \t]*\n\s*")
+_SENTENCE_BREAK: Final = re.compile(r"(?<=[.!?…。！？])\s+")
+
+
+@dataclass(frozen=True)
+class Segment:
+    text: str
+    separator: str = ""  # whitespace that followed the segment in the input
+
+
+def _split(text: str, boundary: re.Pattern[str]) -> list[Segment]:
+    """Cuts `text` at every `boundary` that is not inside a `<keep>` span."""
+    kept = [m.span() for m in _KEEP.finditer(text)]
+    kept_starts = [start for start, _ in kept]
+    pieces: list[Segment] = []
+    start = 0
+    for match in boundary.finditer(text):
+        at = match.start()
+        i = bisect_left(kept_starts, at) - 1
+        if at == start or (i >= 0 and at < kept[i][1]):
+            continue
+        pieces.append(Segment(text[start:at], match.group()))
+        start = match.end()
+    if start < len(text):
+        pieces.append(Segment(text[start:]))
+    return pieces
+
+
+def _pack(pieces: list[Segment], max_tokens: int) -> list[Segment]:
+    packed: list[Segment] = []
+    for piece in pieces:
+        if packed:
+            last = packed[-1]
+            merged = f"{last.text}{last.separator}{piece.text}"
+            if estimate_tokens(merged) <= max_tokens:
+                packed[-1] = Segment(merged, piece.separator)
+                continue
+        packed.append(piece)
+    return packed
+
+
+def _sentences(paragraph: Segment) -> list[Segment]:
+    sentences = _split(paragraph.text, _SENTENCE_BREAK)
+    last = sentences[-1]
+    sentences[-1] = Segment(last.text, last.separator + paragraph.separator)
+    return sentences
+
+
+def split_text(text: str, max_tokens: int) -> list[Segment]:
+    """Splits `text` into segments of about `max_tokens` estimated tokens.
+
+    Cuts at paragraph breaks, and at sentence ends inside paragraphs that
+    are too long on their own; never inside a `<keep>` span. A single
+    sentence longer than `max_tokens` stays one segment. Joining every
+    segment's text and separator gives back `text`."""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return [Segment(text)]
+    segments: list[Segment] = []
+    for paragraph in _split(text, _PARAGRAPH_BREAK):
+        if estimate_tokens(paragraph.text) <= max_tokens:
+            segments.append(paragraph)
+        else:
+            segments.extend(_pack(_sentences(paragraph), max_tokens))
+    if not segments:
+        return [Segment(text)]
+    return _pack(segments, max_tokens)
+
+
+def split_sentences(text: str) -> list[Segment]:
+    """Every sentence of `text` as its own segment, so a sentence is split
+    the same way whatever text it is part of; paragraph breaks end up in
+    the separators. Joining every segment's text and separator gives back
+    `text`."""
+    segments = [
+        sentence
+        for paragraph in _split(text, _PARAGRAPH_BREAK)
+        for sentence in _sentences(paragraph)
+    ]
+    return segments or [Segment(text)]
+
+
+def merge_segments(segments: list[Segment]) -> Segment:
+    """One segment spanning `segments`, which must be neighbours in order."""
+    text = "".join(s.text + s.separator for s in segments[:-1]) + segments[-1].text
+    return Segment(text, segments[-1].separator)
+
+
+def pack_runs(
+    segments: list[Segment], indices: list[int], max_tokens: int
+) -> list[list[int]]:
+    """Groups ascending `indices` of `segments` into runs of neighbours of
+    about `max_tokens` estimated tokens at most; a run never skips an index."""
+    runs: list[list[int]] = []
+    for j in indices:
+        if runs and runs[-1][-1] == j - 1:
+            merged = merge_segments([segments[k] for k in (*runs[-1], j)])
+            if estimate_tokens(merged.text) <= max_tokens:
+                runs[-1].append(j)
+                continue
+        runs.append([j])
+    return runs
+
+
+def join_segments(translations: list[str], segments: list[Segment]) -> str:
+    """Reassembles per-segment translations with the input's whitespace
+    around and between the segments."""
+    if len(segments) == 1:
+        return translations[0]
+    parts: list[str] = []
+    for translation, segment in zip(translations, segments):
+        stripped = segment.text.strip()
+        start = segment.text.find(stripped) if stripped else len(segment.text)
+        parts.append(segment.text[:start])
+        parts.append(translation.strip())
+        parts.append(segment.text[start + len(stripped) :])
+        parts.append(segment.separator)
+    return "".join(parts)
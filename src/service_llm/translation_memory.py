@@ -0,0 +1,53 @@
+import hashlib
+
+from redis.asyncio import Redis
+
+from src.dto.llm_info import Provider
+from src.dto.redis_models import RedisNamespace
+from src.env import settings
+from src.service_llm.llm_cache import normalize_text
+from src.service_llm.llm_clients import client_settings
+
+
+def memory_keys(
+    prompt_version: str,
+    lang_abbr: str,
+    provider: Provider,
+    segments: list[str],
+    variant: int = 0,
+) -> list[str]:
+    """One key per segment:
+    `llm_memory:{pv}:{lang}:{provider}/{model}:v{variant}:{hash}`.
+
+    Context, temperature and the rest of the text are deliberately not part
+    of it, so a sentence is reused whatever text it shows up in. Every
+    variant has its own memory, so variants stay different."""
+    cfg = client_settings(provider)
+    prefix = (
+        f"{RedisNamespace.LLM_MEMORY.value}:{prompt_version}:{lang_abbr}:"
+        f"{cfg.provider.value}/{cfg.model}:v{variant}"
+    )
+    return [
+        f"{prefix}:{hashlib.sha256(normalize_text(segment).encode('utf-8')).hexdigest()}"
+        for segment in segments
+    ]
+
+
+async def recall(keys: list[str], rds: Redis) -> list[str | None]:
+    """Known translations of `keys`, in order, with one MGET."""
+    if not keys:
+        return []
+    return [
+        value.decode("utf-8") if value is not None else None
+        for value in await rds.mget(keys)
+    ]
+
+
+async def remember(items: list[tuple[str, str]], rds: Redis) -> None:
+    """Stores `(key, translation)` pairs in one pipelined round-trip."""
+    if not items:
+        return
+    async with rds.pipeline(transaction=False) as pipe:
+        for key, translation in items:
+            pipe.set(key, translation, ex=settings.LLM_MEMORY_TTL_S)
+        await pipe.execute()
@@ -0,0 +1,151 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Final
+
+from redis.asyncio import Redis
+
+from src.app_api.models.response_models.response_info import (
+    UsageApiMdl,
+    UsageStatApiMdl,
+)
+from src.dto.llm_info import Provider
+from src.dto.redis_models import RedisNamespace
+from src.env import settings
+from src.service_llm.llm_clients import client_settings
+
+logger: Final = logging.getLogger(__name__)
+
+_FIELDS: Final = ("requests", "prompt_tokens", "completion_tokens")
+
+
+def usage_of(message: Any, provider: Provider) -> UsageApiMdl:
+    """Token counts from a LangChain message (or summed stream chunks)."""
+    metadata = getattr(message, "usage_metadata", None) or {}
+    return priced_usage(
+        provider, metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+    )
+
+
+def priced_usage(
+    provider: Provider, prompt_tokens: int, completion_tokens: int
+) -> UsageApiMdl:
+    cfg = client_settings(provider)
+    return UsageApiMdl(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cost_usd=(
+            prompt_tokens * cfg.price_input_1m + completion_tokens * cfg.price_output_1m
+        )
+        / 1_000_000,
+    )
+
+
+def sum_usage(usages: list[UsageApiMdl]) -> UsageApiMdl:
+    if len(usages) == 1:
+        return usages[0]
+    return UsageApiMdl(
+        prompt_tokens=sum(usage.prompt_tokens for usage in usages),
+        completion_tokens=sum(usage.completion_tokens for usage in usages),
+        cost_usd=sum(usage.cost_usd for usage in usages),
+    )
+
+
+def _usage_key(day: date, member: str) -> str:
+    return f"{RedisNamespace.LLM_USAGE.value}:{day.isoformat()}:{member}"
+
+
+def _index_key(day: date) -> str:
+    return f"{RedisNamespace.LLM_USAGE_INDEX.value}:{day.isoformat()}"
+
+
+async def record_usage(
+    prompt_version: str,
+    responses: list[list[tuple[Provider, UsageApiMdl]]],
+    rds: Redis,
+) -> None:
+    """Adds one query's usage to the daily per prompt version/provider
+    counters: a hash of HINCRBY fields plus a daily index of the hashes,
+    written in one pipelined round-trip.
+
+    `responses` holds the provider calls of every variant response. A
+    variant counts as one request for each provider that served any of it,
+    however many segments it was translated in."""
+    totals: dict[Provider, list[Any]] = defaultdict(lambda: [0, 0, 0, 0.0])
+    for calls in responses:
+        for provider in {client_settings(provider).provider for provider, _ in calls}:
+            totals[provider][0] += 1
+        for provider, usage in calls:
+            total = totals[client_settings(provider).provider]
+            total[1] += usage.prompt_tokens
+            total[2] += usage.completion_tokens
+            total[3] += usage.cost_usd
+    if not totals:
+        return
+
+    day = datetime.now(timezone.utc).date()
+    ttl = settings.LLM_USAGE_TTL_DAYS * 24 * 60 * 60
+    async with rds.pipeline(transaction=False) as pipe:
+        for provider, (
+            requests,
+            prompt_tokens,
+            completion_tokens,
+            cost,
+        ) in totals.items():
+            member = f"{prompt_version}:{provider.value}"
+            key = _usage_key(day, member)
+            pipe.hincrby(key, "requests", requests)
+            pipe.hincrby(key, "prompt_tokens", prompt_tokens)
+            pipe.hincrby(key, "completion_tokens", completion_tokens)
+            pipe.hincrbyfloat(key, "cost_usd", cost)
+            pipe.expire(key, ttl)
+            pipe.sadd(_index_key(day), member)
+        pipe.expire(_index_key(day), ttl)
+        await pipe.execute()
+
+
+async def get_usage(
+    day_from: date, day_to: date, prompt_id: int | None, rds: Redis
+) -> list[UsageStatApiMdl]:
+    days = [
+        day_from + timedelta(days=i)
+        for i in range(
+            min((day_to - day_from).days + 1, settings.LLM_USAGE_MAX_QUERY_DAYS)
+        )
+    ]
+    if not days:
+        return []
+    async with rds.pipeline(transaction=False) as pipe:
+        for day in days:
+            pipe.smembers(_index_key(day))
+        indexes = await pipe.execute()
+
+    members = [
+        (day, member.decode("utf-8"))
+        for day, index in zip(days, indexes)
+        for member in sorted(index)
+    ]
+    if prompt_id is not None:
+        members = [(d, m) for d, m in members if m.startswith(f"{prompt_id}v")]
+    if not members:
+        return []
+    async with rds.pipeline(transaction=False) as pipe:
+        for day, member in members:
+            pipe.hgetall(_usage_key(day, member))
+        records = await pipe.execute()
+
+    stats: list[UsageStatApiMdl] = []
+    for (day, member), record in zip(members, records):
+        if not record:
+            continue
+        prompt_version, provider = member.rsplit(":", 1)
+        stats.append(
+            UsageStatApiMdl(
+                day=day,
+                prompt_version=prompt_version,
+                provider=Provider(provider),
+                **{field: int(record.get(field.encode(), 0)) for field in _FIELDS},
+                cost_usd=float(record.get(b"cost_usd", 0)),
+            )
+        )
+    return stats
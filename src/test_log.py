@@ -0,0 +1,30 @@
+import logging
+
+from src.log import DebugSampler, ExFormatter
+
+
+def _record(level: int, msg: str, **extra: str) -> logging.LogRecord:
+    record = logging.LogRecord("src.test", level, __file__, 1, msg, ("x",), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_debug_sampler() -> None:
+    sampler = DebugSampler(every=3)
+    kept = [sampler.filter(_record(logging.DEBUG, "hot %s")) for _ in range(6)]
+    assert kept == [True, False, False, True, False, False]
+    assert sampler.filter(_record(logging.INFO, "hot %s"))
+    assert sampler.filter(_record(logging.DEBUG, "hot %s", req_status="-1"))
+
+    bounded = DebugSampler(every=2, max_templates=2)
+    for msg in ("a %s", "b %s", "c %s"):
+        assert bounded.filter(_record(logging.DEBUG, msg))
+    assert len(bounded._seen) == 2  # noqa: SLF001
+    assert bounded.filter(_record(logging.DEBUG, "a %s"))  # evicted, counts anew
+
+
+def test_ex_formatter() -> None:
+    line = ExFormatter().format(_record(logging.INFO, "hello %s", req_id="abc", k="v"))
+    assert "hello x" in line
+    assert "{'k': 'v'}" in line
+    assert "000000abc|" in line
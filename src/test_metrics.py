@@ -0,0 +1,58 @@
+from fakeredis.aioredis import FakeRedis
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+from src.app_api.dependencies import get_redis_db_main
+from src.app_api.main import get_app
+from src.conftest import FakeLLM
+from src.dto.llm_info import Provider
+from src.service_llm.provider_scheduler import scheduler_for
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics(rds: FakeRedis, fake_llm: FakeLLM, prompt: int) -> None:
+    app = get_app()
+    app.dependency_overrides[get_redis_db_main] = lambda: rds
+    client = TestClient(app)
+    provider = {"provider": "openai", "model": scheduler_for(Provider.openai).model}
+    calls = _sample("llm_call_duration_seconds_count", outcome="ok", **provider)
+    misses = _sample("llm_cache_lookups_total", kind="manual", result="miss")
+    hits = _sample("llm_cache_lookups_total", kind="manual", result="hit")
+
+    body = {
+        "text": "hello",
+        "context": "",
+        "exclude": {"exception": "", "exceptions_list": []},
+        "variants": 1,
+        "temperature": 0,
+    }
+    for _ in range(2):
+        response = client.post(
+            f"/create_query/{prompt}/es", params={"cache_key": "metrics"}, json=body
+        )
+        assert response.json()["translations"] == ["HELLO"]
+
+    assert _sample("llm_call_duration_seconds_count", outcome="ok", **provider) == (
+        calls + 1
+    )
+    assert _sample("llm_calls_in_flight", **provider) == 0
+    assert _sample("llm_cache_lookups_total", kind="manual", result="miss") == (
+        misses + 1
+    )
+    assert _sample("llm_cache_lookups_total", kind="manual", result="hit") == hits + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    routes = {
+        sample.labels["route"]
+        for family in text_string_to_metric_families(response.text)
+        if family.name == "http_request_duration_seconds"
+        for sample in family.samples
+    }
+    assert "/create_query/{prompt_id}/{lang_abbr}" in routes
+    assert f"/create_query/{prompt}/es" not in routes
+    assert "/metrics" not in routes
@@ -0,0 +1,176 @@
+"""OpenAI-compatible stand-in for benchmarks.
+
+    python -m srv.bench.fake_provider --port 41300 --latency-ms 300 --tokens-per-s 80
+
+Serves GET /v1/models and POST /v1/chat/completions (plain and SSE
+streaming, with usage). Latency is `latency_ms` to the first token plus
+`completion_tokens / tokens_per_s`; a share of calls fails with 500 or 429.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+
+@dataclass(frozen=True)
+class FakeProviderSettings:
+    latency_ms: float = 300.0
+    jitter_ms: float = 50.0
+    tokens_per_s: float = 80.0
+    completion_tokens: int = 40
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_s: float = 0.5
+
+
+def _prompt_tokens(body: dict[str, Any]) -> int:
+    return sum(
+        len(str(m.get("content", ""))) // 4 + 1 for m in body.get("messages", [])
+    )
+
+
+def _error(
+    status: int, message: str, headers: dict[str, str] | None = None
+) -> Response:
+    return JSONResponse(
+        {"error": {"message": message, "type": "fake_provider", "code": status}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def get_app(cfg: FakeProviderSettings) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/v1/models")
+    async def models() -> dict[str, Any]:
+        return {"object": "list", "data": [{"id": "fake", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        roll = random.random()
+        if roll < cfg.error_rate:
+            return _error(500, "injected failure")
+        if roll < cfg.error_rate + cfg.rate_limit_rate:
+            return _error(
+                429, "injected rate limit", {"retry-after": str(cfg.retry_after_s)}
+            )
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake")
+        tokens = min(
+            cfg.completion_tokens, body.get("max_tokens") or cfg.completion_tokens
+        )
+        usage = {
+            "prompt_tokens": _prompt_tokens(body),
+            "completion_tokens": tokens,
+            "total_tokens": _prompt_tokens(body) + tokens,
+        }
+        first_token_s = (
+            max(0.0, cfg.latency_ms + random.uniform(-1, 1) * cfg.jitter_ms) / 1000
+        )
+        token_s = 1 / cfg.tokens_per_s if cfg.tokens_per_s > 0 else 0.0
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_s + tokens * token_s)
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {
+                                "role": "assistant",
+                                "content": "tok " * tokens,
+                            },
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def events() -> AsyncIterator[str]:
+            def chunk(delta: dict[str, Any], finish: str | None = None) -> str:
+                return (
+                    "data: "
+                    + json.dumps(
+                        {
+                            "id": completion_id,
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [
+                                {"index": 0, "delta": delta, "finish_reason": finish}
+                            ],
+                        }
+                    )
+                    + "\n\n"
+                )
+
+            await asyncio.sleep(first_token_s)
+            yield chunk({"role": "assistant", "content": ""})
+            for _ in range(tokens):
+                yield chunk({"content": "tok "})
+                await asyncio.sleep(token_s)
+            yield chunk({}, "stop")
+            if include_usage:
+                yield (
+                    "data: "
+                    + json.dumps(
+                        {
+                            "id": completion_id,
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [],
+                            "usage": usage,
+                        }
+                    )
+                    + "\n\n"
+                )
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=41300)
+    defaults = FakeProviderSettings()
+    for name, value in vars(defaults).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=type(value), default=value
+        )
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    uvicorn.run(
+        get_app(FakeProviderSettings(**args)),
+        host=host,
+        port=port,
+        log_level="warning",
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
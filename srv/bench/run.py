@@ -0,0 +1,377 @@
+"""Benchmarks the real app from `get_app` against the local fake provider.
+
+    python -m srv.bench.run --requests 200 --concurrency 32 --out bench.json
+    python -m srv.bench.run --scenarios replay --replay traffic.jsonl
+
+The app runs in-process under uvicorn (lifespan included) and the fake
+provider in a subprocess. Redis is fakeredis (a dev dependency) unless
+--redis-host is given.
+
+Results are one JSON document: per scenario throughput and latency
+percentiles in milliseconds, so runs can be diffed.
+
+Replay files hold one JSON object per line, either a full request
+({"method": "POST", "path": "/create_query/1/en", "params": {...},
+"json": {...}}) or just a text ({"text": ...}, falling back to "body" or
+"title") sent to create_query with the bench prompt.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+import uvicorn
+from pydantic import SecretStr
+
+from srv.bench.fake_provider import FakeProviderSettings
+
+BENCH_PROMPT_ID = 900_001
+BENCH_TEMPLATE = (
+    "Translate the following text into {lang_abbr}. Context:\n{context}\n\n"
+    "Exclude:\n{exclude}\n\nText:\n{text}"
+)
+SCENARIOS = ("cache_miss", "cache_hit", "fanout", "stream", "replay")
+
+
+@dataclass
+class Sample:
+    latency_s: float
+    ok: bool
+    first_byte_s: float | None = None
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered) + 0.5) - 1))]
+
+
+def _latency_stats(values: list[float]) -> dict[str, float]:
+    ms = [v * 1000 for v in values]
+    return {
+        "p50": _percentile(ms, 0.50),
+        "p95": _percentile(ms, 0.95),
+        "p99": _percentile(ms, 0.99),
+        "mean": sum(ms) / len(ms) if ms else 0.0,
+        "max": max(ms, default=0.0),
+    }
+
+
+def _report(samples: list[Sample], wall_s: float, concurrency: int) -> dict[str, Any]:
+    report: dict[str, Any] = {
+        "requests": len(samples),
+        "concurrency": concurrency,
+        "errors": sum(1 for s in samples if not s.ok),
+        "wall_s": wall_s,
+        "throughput_rps": len(samples) / wall_s if wall_s > 0 else 0.0,
+        "latency_ms": _latency_stats([s.latency_s for s in samples]),
+    }
+    first_bytes = [s.first_byte_s for s in samples if s.first_byte_s is not None]
+    if first_bytes:
+        report["first_byte_ms"] = _latency_stats(first_bytes)
+    return report
+
+
+async def _run_load(
+    calls: list[Callable[[], Awaitable[Sample]]], concurrency: int
+) -> dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(call: Callable[[], Awaitable[Sample]]) -> Sample:
+        async with semaphore:
+            return await call()
+
+    started_at = time.perf_counter()
+    samples = await asyncio.gather(*(_one(call) for call in calls))
+    return _report(list(samples), time.perf_counter() - started_at, concurrency)
+
+
+def _query(text: str, variants: int = 1) -> dict[str, Any]:
+    return {
+        "text": text,
+        "context": "",
+        "exclude": {"exception": "", "exceptions_list": []},
+        "variants": variants,
+        "temperature": 0,
+    }
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    method: str,
+    path: str,
+    params: dict[str, Any] | None = None,
+    body: Any = None,
+) -> Sample:
+    started_at = time.perf_counter()
+    try:
+        response = await client.request(method, path, params=params, json=body)
+        data = response.json()
+        ok = response.status_code == 200 and not (
+            isinstance(data, dict) and data.get("error")
+        )
+    except Exception:
+        ok = False
+    return Sample(time.perf_counter() - started_at, ok)
+
+
+async def _send_stream(
+    client: httpx.AsyncClient, path: str, params: dict[str, Any], body: Any
+) -> Sample:
+    started_at = time.perf_counter()
+    first_byte_s: float | None = None
+    ok = True
+    try:
+        async with client.stream("POST", path, params=params, json=body) as response:
+            ok = response.status_code == 200
+            async for line in response.aiter_lines():
+                if first_byte_s is None:
+                    first_byte_s = time.perf_counter() - started_at
+                if line and json.loads(line).get("error"):
+                    ok = False
+    except Exception:
+        ok = False
+    return Sample(time.perf_counter() - started_at, ok, first_byte_s)
+
+
+def _replay_calls(
+    client: httpx.AsyncClient, path: Path, lang: str
+) -> list[Callable[[], Awaitable[Sample]]]:
+    calls: list[Callable[[], Awaitable[Sample]]] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "path" in record:
+            calls.append(
+                lambda r=record: _send(
+                    client,
+                    r.get("method", "POST"),
+                    r["path"],
+                    r.get("params"),
+                    r.get("json"),
+                )
+            )
+            continue
+        text = record.get("text") or record.get("body") or record.get("title") or ""
+        calls.append(
+            lambda t=text: _send(
+                client,
+                "POST",
+                f"/create_query/{BENCH_PROMPT_ID}/{lang}",
+                None,
+                _query(t),
+            )
+        )
+    return calls
+
+
+async def run_scenarios(
+    client: httpx.AsyncClient, args: argparse.Namespace
+) -> dict[str, Any]:
+    path = f"/create_query/{BENCH_PROMPT_ID}/{args.lang}"
+    n, concurrency = args.requests, args.concurrency
+    run_id = time.time_ns()
+    results: dict[str, Any] = {}
+    for scenario in args.scenarios:
+        match scenario:
+            case "cache_miss":
+                calls = [
+                    lambda i=i: _send(
+                        client, "POST", path, None, _query(f"miss {run_id} {i}")
+                    )
+                    for i in range(n)
+                ]
+            case "cache_hit":
+                params = {"cache_key": f"bench:hit:{run_id}"}
+                await _send(client, "POST", path, params, _query(f"hit {run_id}"))
+                calls = [
+                    lambda: _send(client, "POST", path, params, _query(f"hit {run_id}"))
+                    for _ in range(n)
+                ]
+            case "fanout":
+                calls = [
+                    lambda i=i: _send(
+                        client,
+                        "POST",
+                        path,
+                        None,
+                        _query(f"fanout {run_id} {i}", args.variants),
+                    )
+                    for i in range(n)
+                ]
+            case "stream":
+                stream_path = f"/create_query_stream/{BENCH_PROMPT_ID}/{args.lang}"
+                calls = [
+                    lambda i=i: _send_stream(
+                        client,
+                        stream_path,
+                        {},
+                        _query(f"stream {run_id} {i}", args.variants),
+                    )
+                    for i in range(n)
+                ]
+            case "replay":
+                if args.replay is None:
+                    continue
+                calls = _replay_calls(client, args.replay, args.lang)
+            case _:
+                raise ValueError(f"unknown scenario: {scenario}")
+        results[scenario] = await _run_load(calls, concurrency)
+        print(
+            f"{scenario}: {json.dumps(results[scenario]['latency_ms'])}",
+            file=sys.stderr,
+        )
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_fake_provider(
+    cfg: FakeProviderSettings, port: int
+) -> subprocess.Popen[bytes]:
+    cmd = [sys.executable, "-m", "srv.bench.fake_provider", "--port", str(port)]
+    for name, value in asdict(cfg).items():
+        cmd += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(cmd)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/v1/models", timeout=0.5)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake provider did not start")
+
+
+async def _bench(args: argparse.Namespace, provider_url: str) -> dict[str, Any]:
+    from src.env import settings
+
+    settings.OPENAI_BASE_URL = provider_url
+    settings.OPENAI_API_KEY = SecretStr("bench")
+    settings.DEEPSEEK_BASE_URL = provider_url
+    settings.DEEPSEEK_API_KEY = SecretStr("bench")
+    if args.redis_host:
+        settings.REDIS_HOST = SecretStr(args.redis_host)
+        settings.REDIS_PORT = SecretStr(str(args.redis_port))
+    else:
+        try:
+            from fakeredis.aioredis import FakeRedis
+        except ImportError:
+            raise SystemExit("fakeredis is not installed, pass --redis-host")
+        from src.app_api import dependencies
+
+        dependencies._redis_db_main = FakeRedis()  # noqa: SLF001
+
+    from src.app_api.main import get_app
+
+    # served by uvicorn on the same loop (httpx's ASGI transport would buffer
+    # streaming responses), so fakeredis can still be shared with the app
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            get_app(),
+            host="127.0.0.1",
+            port=port,
+            loop="asyncio",
+            log_level="warning",
+            access_log=False,
+        )
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        ) as client:
+            await client.post(
+                f"/create_prompt/{BENCH_PROMPT_ID}",
+                json={"prompt_id": BENCH_PROMPT_ID, "prompt_template": BENCH_TEMPLATE},
+            )
+            return await run_scenarios(client, args)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS)
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--variants", type=int, default=4, help="fan-out per query")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--replay", type=Path, default=None)
+    parser.add_argument("--redis-host", default="")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    defaults = FakeProviderSettings()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=type(value), default=value
+        )
+    args = parser.parse_args()
+    cfg = FakeProviderSettings(
+        **{name: getattr(args, name) for name in asdict(defaults)}
+    )
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    port = _free_port()
+    provider = _start_fake_provider(cfg, port)
+    try:
+        started_at = datetime.now(timezone.utc)
+        scenarios = asyncio.run(_bench(args, f"http://127.0.0.1:{port}/v1"))
+    finally:
+        provider.terminate()
+        provider.wait()
+
+    report = {
+        "started_at": started_at.isoformat(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "redis": f"{args.redis_host}:{args.redis_port}"
+        if args.redis_host
+        else "fakeredis",
+        "fake_provider": asdict(cfg),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "variants": args.variants,
+        "scenarios": scenarios,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out is None:
+        print(output)
+    else:
+        args.out.write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()